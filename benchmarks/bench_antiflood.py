@@ -0,0 +1,62 @@
+# Бенчмарк антифлуда: рейд из множества новых пользователей и повторные реакции
+# Запуск: python benchmarks/bench_antiflood.py [число_реакций]
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.antispam import AntiFlood
+
+async def first_reactions(flood, count):
+    # Первая реакция нового пользователя всегда проходит
+    for key in range(count):
+        assert not await flood.check_flood(key), f"Первая реакция ключа {key} отклонена"
+        assert await flood.check_flood(key), f"Повторная реакция ключа {key} пропущена"
+
+async def raid_eviction(flood, count):
+    # Волна новых ключей при пределе памяти не сбрасывает лимит активного флудера
+    assert not await flood.check_flood(0)
+    for key in range(1, count):
+        await flood.check_flood(key)
+        if key % 10 == 0:
+            assert await flood.check_flood(0), f"Флудер пропущен после {key} новых ключей"
+
+async def run(flood, keys, flooders):
+    # Возвращает время и число пропущенных реакций постоянных флудеров
+    passed = 0
+    started = time.perf_counter()
+    for key in keys:
+        if not await flood.check_flood(key) and key in flooders:
+            passed += 1
+    return time.perf_counter() - started, passed
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(42)
+
+    asyncio.run(first_reactions(AntiFlood(), 1000))
+    print("Первые реакции новых ключей: пропущены, повторные: отклонены")
+    asyncio.run(raid_eviction(AntiFlood(max_keys=100), 5000))
+    print("Вытеснение при пределе ключей сохраняет бакеты активных флудеров")
+
+    # Рейд: половина реакций от новых аккаунтов, половина - от ограниченного круга флудеров
+    flooders = range(1, 501)
+    keys = [10 ** 9 + i if rng.random() < 0.5 else rng.choice(flooders) for i in range(count)]
+    flood = AntiFlood(max_keys=50000)
+    tracemalloc.start()
+    elapsed, passed = asyncio.run(run(flood, keys, flooders))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Реакций: {count}, {flood.stats()}")
+    # Без восстановления токенов каждый флудер проходит один раз; вытеснение не должно сбрасывать лимит
+    print(f"Флудеров: {len(flooders)}, их реакций пропущено: {passed} "
+          f"(допустимо до {len(flooders) * (1 + int(elapsed * flood.rate + 1))})")
+    print(f"Проверка: {count / elapsed:,.0f} реакций/сек, пик памяти {peak / 2 ** 20:.1f} МБ")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
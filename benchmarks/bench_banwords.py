@@ -0,0 +1,82 @@
+# Микробенчмарк поиска запрещённых слов: стоимость одного распознанного фрагмента
+# Запуск: python benchmarks/bench_banwords.py [число_слов]
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.banwords import BanWordMatcher
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщыэюя'
+ENDINGS = ['', 'а', 'ом', 'ами', 'ой', 'ый', 'ать', 'ешь', 'ся']
+# Короткие слова на гласную: словоформы обязаны находиться, похожие обычные слова - нет
+INFLECTED = {'сука': ['суки', 'суку', 'сукой'], 'жопа': ['жопу', 'жопы', 'жопой']}
+LOOKALIKES = ['сукно', 'херсон', 'дебит']
+
+def random_word(rng, low=4, high=10):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(low, high)))
+
+def typo(rng, word):
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice(ALPHABET) + word[i + 1:]
+
+def check_known_words():
+    # Короткая основа (допуск 0) совпадает только точно: "деби" не ловит "дебит"
+    matcher = BanWordMatcher(['дебил', 'хер', *INFLECTED])
+    for word in ('дебит', 'дебиту', 'дебет'):
+        assert matcher.match_word(word) is None, f"{word} принято за запрещённое"
+    assert matcher.match_word('дебила') == 'дебил'
+    for banned, forms in INFLECTED.items():
+        for form in forms:
+            assert matcher.match_word(form) == banned, f"{form} не найдено"
+    for word in LOOKALIKES:
+        assert matcher.match_word(word) is None, f"{word} принято за запрещённое"
+    print("Допуск опечаток по длине основы и словоформы коротких слов соблюдаются")
+
+def main():
+    check_known_words()
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(42)
+    banned = [random_word(rng) for _ in range(count)] + list(INFLECTED)
+    forms = [form for group in INFLECTED.values() for form in group]
+
+    started = time.perf_counter()
+    matcher = BanWordMatcher(banned)
+    print(f"Построение: {len(banned)} слов, {len(matcher)} основ за {time.perf_counter() - started:.2f} сек")
+
+    # Фрагменты по 12 слов: обычная речь, словоформы и опечатки запрещённых слов
+    vocabulary = [random_word(rng, 2, 9) for _ in range(3000)]
+    transcripts = []  # (слова, есть ли вставленное запрещённое слово)
+    injected = 0
+    for _ in range(2000):
+        words = [rng.choice(vocabulary) for _ in range(12)]
+        dirty = rng.random() < 0.2
+        if dirty:
+            injected += 1
+            if rng.random() < 0.1:
+                words[rng.randrange(12)] = rng.choice(forms)
+            else:
+                word = rng.choice(banned) + rng.choice(ENDINGS)
+                words[rng.randrange(12)] = typo(rng, word) if rng.random() < 0.5 else word
+        transcripts.append((words, dirty))
+
+    print(f"Фрагментов: {len(transcripts)}, с запрещёнными словами: {injected}")
+    for label in ('холодный кэш', 'тёплый кэш'):
+        hits = false_positives = 0
+        started = time.perf_counter()
+        for words, dirty in transcripts:
+            if matcher.find(words):
+                if dirty:
+                    hits += 1
+                else:
+                    false_positives += 1
+        elapsed = time.perf_counter() - started
+        print(f"{label}: {elapsed / len(transcripts) * 1e6:.1f} мкс на фрагмент, "
+              f"найдено {hits}/{injected}, ложных срабатываний {false_positives}/{len(transcripts) - injected}")
+
+    flagged = [word for word in vocabulary if matcher.match_word(word)]
+    print(f"Обычных слов словаря принято за запрещённые: {len(flagged)}/{len(vocabulary)}")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
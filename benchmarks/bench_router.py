@@ -0,0 +1,72 @@
+# Бенчмарк разбора команд: сообщений в секунду на загруженном сервере
+# Запуск: python benchmarks/bench_router.py [число_сообщений]
+import os
+import sys
+import time
+import random
+import asyncio
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.router import CommandRouter
+
+ALLOWED_CHANNEL = 1
+COMMANDS = ['help', 'status', 'join', 'leave', 'set_threshold', 'set_duration', 'set_calibration']
+EXT_COMMANDS = ['mute', 'unmute', 'reload_banwords']
+
+class StubBot:
+    # Минимум для роутера: таблица команд discord.py и дешёвый контекст
+    all_commands = dict.fromkeys(EXT_COMMANDS)
+
+    async def get_context(self, message):
+        return SimpleNamespace(message=message, command=object())
+
+    async def invoke(self, ctx):
+        pass
+
+def make_messages(count, rng):
+    # Чат сервера: 90% обычные сообщения, остальное - команды в разных каналах
+    words = ['привет', 'как', 'дела', 'го', 'в', 'войс', 'ок', 'лол', 'норм']
+    people = [SimpleNamespace(bot=False) for _ in range(50)]
+    bots = [SimpleNamespace(bot=True)]
+    messages = []
+    for _ in range(count):
+        roll = rng.random()
+        channel = SimpleNamespace(id=ALLOWED_CHANNEL if rng.random() < 0.3 else rng.randint(2, 40))
+        if roll < 0.9:
+            content = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 12)))
+        elif roll < 0.95:
+            content = '!' + rng.choice(COMMANDS + EXT_COMMANDS) + ' 123'
+        else:
+            content = '!' + rng.choice(words)  # С префиксом, но не команда бота
+        author = rng.choice(bots) if rng.random() < 0.05 else rng.choice(people)
+        messages.append(SimpleNamespace(channel=channel, author=author, content=content))
+    return messages
+
+async def handler(ctx, args):
+    pass
+
+async def allow(message):
+    return True
+
+async def run(router, messages):
+    started = time.perf_counter()
+    for message in messages:
+        await router.dispatch(message)
+    return time.perf_counter() - started
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rng = random.Random(42)
+    router = CommandRouter(StubBot(), '!', ALLOWED_CHANNEL)
+    for name in COMMANDS:
+        router.register(name, handler, check=allow)
+    router.refresh()
+
+    messages = make_messages(count, rng)
+    elapsed = asyncio.run(run(router, messages))
+    print(f"Сообщений: {count}, до обработчика дошло: {router.routed}")
+    print(f"Разбор: {count / elapsed:,.0f} сообщений/сек, {elapsed / count * 1e6:.2f} мкс на сообщение")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,62 @@
+# Бенчмарк запуска: время импорта модулей бота (python -X importtime) и подготовки ядер numba
+# Запуск: python benchmarks/bench_startup.py [число_строк]
+import os
+import sys
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = 'cogs.roles, cogs.voice, cogs.security, cogs.moderation'
+# Для импорта config достаточно любых числовых ID
+REQUIRED_ENV = ('GUILD_ID', 'POST_ID', 'ALLOWED_CHANNEL_ID', 'ROLE_ID_1', 'ROLE_ID_2', 'ROLE_ID_3',
+                'VOICE_CHANNEL_ID', 'LOG_CHANNEL_ID')
+
+def run(code, env, importtime=False):
+    args = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    result = subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+    return result
+
+def import_times(env):
+    # Строки вида "import time: self [us] | cumulative | imported package"
+    stderr = run(f'import {MODULES}', env, importtime=True).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line.split(':', 1)[1].split('|')
+        times[name[1:].rstrip()] = (int(own), int(cumulative))  # Отступ имени - глубина вложенности
+    return times
+
+def warmup_time(env):
+    code = 'from utils.audio import warmup_kernels; print(warmup_kernels())'
+    return float(run(code, env).stdout.split()[-1])
+
+def main():
+    top = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    env = dict(os.environ)
+    for name in REQUIRED_ENV:
+        env.setdefault(name, '0')
+
+    times = import_times(env)
+    roots = {name: cumulative for name, (_, cumulative) in times.items() if not name.startswith(' ')}
+    print(f"Импорт модулей бота: {sum(roots.values()) / 1e6:.2f} сек")
+    print("Самые тяжёлые модули (всего с зависимостями, мс):")
+    for name, cumulative in sorted(roots.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {cumulative / 1000:8.1f}  {name}")
+
+    # Пакеты верхнего уровня на любой глубине: сразу видно, кто тянет numba, numpy и т.п.
+    packages = {name.strip(): cumulative for name, (_, cumulative) in times.items() if '.' not in name}
+    print("Самые тяжёлые пакеты (мс):")
+    for name, cumulative in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {cumulative / 1000:8.1f}  {name}")
+
+    # Холодный кэш numba - отдельный каталог, тёплый - он же при повторном запуске
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env['NUMBA_CACHE_DIR'] = cache_dir
+        for label in ('холодный кэш', 'тёплый кэш'):
+            print(f"Подготовка ядер numba, {label}: {warmup_time(env) * 1000:.0f} мс")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
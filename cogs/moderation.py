@@ -4,15 +4,27 @@ from datetime import datetime, timedelta
 import asyncio
 import logging
 from typing import Optional
+from utils.permissions import is_moderator
 
 class VoiceModeration(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.manual_mutes = {}  # {user_id: mute_info}
-        self.mute_tasks = {}    # {user_id: task}
+        self.manual_mutes = self.load_manual_mutes()  # {user_id: mute_info}
         self.locks = {}         # {user_id: lock} для управления потоками
+        self.bot.scheduler.register('manual_unmute', self.auto_unmute_user)
         print("🔹 Модуль модерации голосовых каналов инициализирован")
 
+    def load_manual_mutes(self) -> dict:
+        # Ручные муты из хранилища (переживают перезапуск)
+        mutes = self.bot.store.load_manual_mutes()
+        for mute_info in mutes.values():
+            mute_info['muted_at'] = datetime.fromtimestamp(mute_info['muted_at'])
+        return mutes
+
+    def forget_mute(self, user_id: int):
+        self.manual_mutes.pop(user_id, None)
+        self.bot.store.delete_manual_mute(user_id)
+
     async def get_lock(self, user_id: int) -> asyncio.Lock:
         # Получаем или создаем lock для пользователя
         if user_id not in self.locks:
@@ -20,7 +32,7 @@ class VoiceModeration(commands.Cog):
         return self.locks[user_id]
 
     @commands.command()
-    @commands.has_role('Генсек')
+    @is_moderator()
     async def mute(self, ctx, member: discord.Member, duration: Optional[int] = None):
         # Замьютить пользователя в текущем канале
         if not member.voice or not member.voice.channel:
@@ -35,7 +47,7 @@ class VoiceModeration(commands.Cog):
                 await ctx.send("❌ Не удалось замьютить пользователя (проверьте права бота)", delete_after=10)
 
     @commands.command()
-    @commands.has_role('Генсек')
+    @is_moderator()
     async def unmute(self, ctx, member: discord.Member):
         # Размьютить пользователя
         async with await self.get_lock(member.id):
@@ -44,7 +56,7 @@ class VoiceModeration(commands.Cog):
                 # Проверяем, есть ли технический мут
                 if member.voice and member.voice.mute:
                     try:
-                        await member.edit(mute=False)
+                        await self.bot.dispatcher.set_mute(member, False)
                         await ctx.send(f"✅ {member.mention} размьючен (технический мут)")
                         return
                     except discord.Forbidden:
@@ -54,29 +66,22 @@ class VoiceModeration(commands.Cog):
                     await ctx.send(f"❌ Пользователь {member.mention} не был замьючен", delete_after=5)
                     return
 
-            # Отменяем задачу авторазмута если есть
-            if member.id in self.mute_tasks:
-                self.mute_tasks[member.id].cancel()
-                try:
-                    await self.mute_tasks[member.id]  # Дожидаемся отмены
-                except asyncio.CancelledError:
-                    pass
-                del self.mute_tasks[member.id]
+            # Отменяем авторазмут если есть
+            self.bot.scheduler.cancel(('manual_unmute', member.id))
 
             # Полностью очищаем информацию о муте для избежания повторного мута
-            if member.id in self.manual_mutes:
-                del self.manual_mutes[member.id]
+            self.forget_mute(member.id)
 
             # Пытаемся снять мут
             try:
-                await member.edit(mute=False)
+                await self.bot.dispatcher.set_mute(member, False)
                 await ctx.send(f"✅ {member.mention} размьючен")
-                print(f"🔊 Размучен: {member.display_name} (полное снятие)")
+                logging.info(f"🔊 Размучен: {member.display_name} (полное снятие)", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'unmute'})
             except discord.Forbidden:
                 await ctx.send("❌ Нет прав для размута", delete_after=5)
             except Exception as e:
                 await ctx.send(f"❌ Ошибка при размуте: {str(e)}", delete_after=10)
-                print(f"❌ Ошибка размута {member.display_name}: {e}")
+                logging.error(f"❌ Ошибка размута {member.display_name}: {e}", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'unmute'})
 
     async def mute_user_in_channel(self, member: discord.Member, channel: discord.VoiceChannel, 
                                  duration: Optional[int], moderator: Optional[discord.Member]) -> bool:
@@ -91,24 +96,29 @@ class VoiceModeration(commands.Cog):
             'muted_at': datetime.now(),
             'duration': duration
         }
+        self.bot.store.save_manual_mute(
+            member.id, channel.id, moderator.id if moderator else None,
+            self.manual_mutes[member.id]['muted_at'].timestamp(), duration
+        )
 
         try:
             if member.voice and member.voice.channel.id == channel.id:
-                await member.edit(mute=True)
-                print(f"🔇 Мут: {member.display_name} в {channel.name}")
+                await self.bot.dispatcher.set_mute(member, True)
+                logging.info(f"🔇 Мут: {member.display_name} в {channel.name}", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'mute'})
 
             if duration:
-                # Создаем задачу на авторазмут
-                task = asyncio.create_task(self.auto_unmute_user(member, duration))
-                self.mute_tasks[member.id] = task
-                task.add_done_callback(lambda t: self._cleanup_task(member.id, t))
+                # Ставим авторазмут в общий планировщик
+                self.bot.scheduler.schedule(
+                    ('manual_unmute', member.id), 'manual_unmute', duration,
+                    {'guild_id': member.guild.id, 'user_id': member.id}
+                )
 
             return True
         except discord.Forbidden:
-            print(f"❌ Нет прав для мута {member.display_name}")
+            logging.error(f"❌ Нет прав для мута {member.display_name}", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'mute'})
             return False
         except Exception as e:
-            print(f"❌ Ошибка при муте {member.display_name}: {e}")
+            logging.error(f"❌ Ошибка при муте {member.display_name}: {e}", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'mute'})
             return False
 
     async def unmute_user_completely(self, member: discord.Member, 
@@ -118,41 +128,34 @@ class VoiceModeration(commands.Cog):
             return False
 
         try:
-            await member.edit(mute=False)
-            print(f"🔊 Размучен: {member.display_name}")
+            await self.bot.dispatcher.set_mute(member, False)
+            logging.info(f"🔊 Размучен: {member.display_name}", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'unmute'})
             
             # Удаляем из ручных мутов
-            del self.manual_mutes[member.id]
+            self.forget_mute(member.id)
             
-            # Очищаем задачу, если есть
-            if member.id in self.mute_tasks:
-                self.mute_tasks[member.id].cancel()
-                del self.mute_tasks[member.id]
+            # Отменяем авторазмут, если есть
+            self.bot.scheduler.cancel(('manual_unmute', member.id))
                 
             return True
         except discord.Forbidden:
-            print(f"❌ Нет прав для размута {member.display_name}")
+            logging.error(f"❌ Нет прав для размута {member.display_name}", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'unmute'})
             return False
         except Exception as e:
-            print(f"❌ Ошибка при размуте {member.display_name}: {e}")
+            logging.error(f"❌ Ошибка при размуте {member.display_name}: {e}", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'unmute'})
             return False
         
-    async def auto_unmute_user(self, member: discord.Member, duration: int):
-        # Автоматическое снятие мута
-        try:
-            await asyncio.sleep(duration)
-            async with await self.get_lock(member.id):
-                if member.id in self.manual_mutes:
-                    await self.unmute_user_completely(member)
-        except asyncio.CancelledError:
-            pass  # Задача была отменена - это нормально
-        except Exception as e:
-            print(f"❌ Ошибка в auto_unmute_user для {member.display_name}: {e}")
-
-    def _cleanup_task(self, user_id: int, task: asyncio.Task):
-        # Очистка завершенных задач
-        if user_id in self.mute_tasks and self.mute_tasks[user_id] == task:
-            del self.mute_tasks[user_id]
+    async def auto_unmute_user(self, payload: dict):
+        # Автоматическое снятие мута (вызывается планировщиком)
+        user_id = payload['user_id']
+        guild = self.bot.get_guild(payload['guild_id'])
+        member = guild.get_member(user_id) if guild else None
+        async with await self.get_lock(user_id):
+            if member is None:
+                self.forget_mute(user_id)  # Пользователь покинул сервер
+                return
+            if member.id in self.manual_mutes:
+                await self.unmute_user_completely(member)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, 
@@ -167,15 +170,14 @@ class VoiceModeration(commands.Cog):
                 return
                 
             mute_info = self.manual_mutes[member.id]
-            current_time = datetime.now().strftime("%H:%M:%S")
             
             # Пользователь вышел из голосового канала
             if before.channel and not after.channel:
                 try:
                     was_muted = before.mute
-                    await member.edit(mute=False)
+                    await self.bot.dispatcher.set_mute(member, False)
                     if was_muted:
-                        print(f"{current_time} | 🔊 {member.display_name} вышел из канала (мут временно снят)")
+                        logging.info(f"🔊 {member.display_name} вышел из канала (мут временно снят)", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'unmute'})
                 except discord.Forbidden:
                     pass
                 return
@@ -185,8 +187,8 @@ class VoiceModeration(commands.Cog):
                 if after.channel.id == mute_info['channel_id']:
                     try:
                         if not member.voice.mute:
-                            await member.edit(mute=True)
-                            print(f"{current_time} | 🔇 {member.display_name} подключился к каналу (мут применён)")
+                            await self.bot.dispatcher.set_mute(member, True)
+                            logging.info(f"🔇 {member.display_name} подключился к каналу (мут применён)", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'mute'})
                     except discord.Forbidden:
                         pass
                 return
@@ -197,8 +199,8 @@ class VoiceModeration(commands.Cog):
                 if before.channel.id == mute_info['channel_id'] and after.channel.id != mute_info['channel_id']:
                     try:
                         if before.mute:
-                            await member.edit(mute=False)
-                            print(f"{current_time} | 🔊 {member.display_name} покинул замьюченный канал")
+                            await self.bot.dispatcher.set_mute(member, False)
+                            logging.info(f"🔊 {member.display_name} покинул замьюченный канал", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'unmute'})
                     except discord.Forbidden:
                         pass
                 
@@ -206,16 +208,14 @@ class VoiceModeration(commands.Cog):
                 elif after.channel.id == mute_info['channel_id'] and before.channel.id != mute_info['channel_id']:
                     try:
                         if not member.voice.mute:
-                            await member.edit(mute=True)
-                            print(f"{current_time} | 🔇 {member.display_name} вернулся в замьюченный канал")
+                            await self.bot.dispatcher.set_mute(member, True)
+                            logging.info(f"🔇 {member.display_name} вернулся в замьюченный канал", extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'mute'})
                     except discord.Forbidden:
                         pass
 
     async def cog_unload(self):
         # Очистка при выгрузке модуля
-        for task in self.mute_tasks.values():
-            task.cancel()
-        await asyncio.gather(*self.mute_tasks.values(), return_exceptions=True)
+        self.bot.scheduler.unregister('manual_unmute')
 
 async def setup(bot):
     await bot.add_cog(VoiceModeration(bot))
\ No newline at end of file
@@ -2,26 +2,33 @@ import discord
 from discord.ext import commands
 from config import Config
 from datetime import datetime, timedelta
+import asyncio
 import logging
+import time
 from utils.antispam import AntiFlood
-from functools import lru_cache
+from utils.permissions import is_moderator
 
 class Roles(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.antiflood = AntiFlood()
+        self.antiflood = AntiFlood(
+            rate=Config.FLOOD_RATE,
+            burst=Config.FLOOD_BURST,
+            scope=Config.FLOOD_SCOPE,
+            max_keys=Config.FLOOD_MAX_KEYS
+        )
+        self.reconcile_task = None
         print("🔹 Модуль ролей инициализирован")
         
-    @lru_cache(maxsize=100)
     def get_role(self, guild, role_id):
-        return guild.get_role(role_id)
+        return self.bot.role_cache.get(guild, role_id)
         
     async def validate_request(self, payload):
         if payload.message_id != Config.POST_ID:
             return False
         if payload.channel_id != Config.ALLOWED_CHANNEL_ID:
             return False
-        if await self.antiflood.check_flood(payload.user_id):
+        if await self.antiflood.check_flood(self.antiflood.key(payload)):
             return False
         return True
     
@@ -39,57 +46,193 @@ class Roles(commands.Cog):
         
         guild = self.bot.get_guild(payload.guild_id)
         if not guild:
-            print("❌ Сервер не найден")
+            logging.warning("❌ Сервер не найден", extra={'guild': payload.guild_id})
             return
             
         member = guild.get_member(payload.user_id)
         if not member:
-            print("❌ Участник не найден")
+            logging.warning("❌ Участник не найден", extra={'user_id': payload.user_id, 'guild': guild.id})
             return
         if member.bot:
-            print("⚠️ Реакция от бота - игнорируем")
+            logging.debug("⚠️ Реакция от бота - игнорируем")
             return
             
         emoji = str(payload.emoji)
         if emoji not in Config.ROLES:
-            print("❌ Эмодзи не привязан к роли")
+            logging.debug("❌ Эмодзи не привязан к роли")
             return
             
         role = self.get_role(guild, Config.ROLES[emoji])
         if not role:
-            print(f"❌ Роль для эмодзи {emoji} не найдена")
+            logging.warning(f"❌ Роль для эмодзи {emoji} не найдена", extra={'guild': guild.id})
             return
             
         try:
-            current_roles = {r.id for r in member.roles if r.id not in Config.EXCROLES}
+            permissions = self.bot.permissions
+            has_role = permissions.has_role(member, role.id)
             
             if add_role:
-                if len(current_roles) >= Config.MAX_ROLES_PER_USER:
+                if permissions.counted_roles(member) >= Config.MAX_ROLES_PER_USER:
                     msg = f"⚠️ Лимит ролей ({Config.MAX_ROLES_PER_USER}) достигнут"
-                    print(msg)
-                    await member.send(msg)
+                    logging.info(msg, extra={'user_id': member.id, 'guild': guild.id, 'action': 'role_limit', 'role_id': role.id})
+                    await self.bot.dispatcher.send(member, msg)
                     return
-                if role.id not in current_roles:
-                    await member.add_roles(role)
+                if not has_role:
+                    await self.bot.dispatcher.edit_roles(member, add=[role])
                     log_msg = f"✅ Выдана роль {role.name} пользователю {member.display_name}"
-                    print(log_msg)
-                    logging.info(log_msg)
+                    logging.info(log_msg, extra={'user_id': member.id, 'guild': guild.id, 'action': 'role_add', 'role_id': role.id})
             else:
-                if role.id in current_roles:
-                    await member.remove_roles(role)
+                if has_role:
+                    await self.bot.dispatcher.edit_roles(member, remove=[role])
                     log_msg = f"❌ Удалена роль {role.name} у {member.display_name}"
-                    print(log_msg)
-                    logging.info(log_msg)
+                    logging.info(log_msg, extra={'user_id': member.id, 'guild': guild.id, 'action': 'role_remove', 'role_id': role.id})
                     
         except discord.Forbidden:
             error_msg = "❌ Недостаточно прав для управления ролями"
-            print(error_msg)
             logging.error(error_msg)
-            await guild.owner.send('⚠️ Боту не хватает прав для управления ролями!')
+            await self.bot.dispatcher.send(guild.owner, '⚠️ Боту не хватает прав для управления ролями!')
         except discord.HTTPException as e:
             error_msg = f"❌ Ошибка обновления ролей: {e}"
-            print(error_msg)
             logging.error(error_msg)
 
+# Сверка ролей с реакциями ===
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # После запуска и переподключения: реакции, поставленные без бота, событий не дали
+        self.start_reconcile("подключение")
+
+    @commands.command(name='reconcile_roles')
+    @is_moderator()
+    async def reconcile_roles(self, ctx):
+        # Принудительная сверка ролей с реакциями на посте
+        if self.start_reconcile(f"команда {ctx.author.display_name}"):
+            await ctx.send("🔄 Сверка ролей с реакциями запущена, итог будет в журнале")
+        else:
+            await ctx.send("ℹ️ Сверка ролей уже выполняется", delete_after=10)
+
+    def start_reconcile(self, reason):
+        if self.reconcile_task and not self.reconcile_task.done():
+            return False
+        self.reconcile_task = asyncio.create_task(self.reconcile_reaction_roles(reason))
+        return True
+
+    async def reconcile_reaction_roles(self, reason):
+        # Реакции на POST_ID сравниваются с текущими владельцами ролей из кэша участников;
+        # выполняются только недостающие изменения. Готовые эмодзи сохраняются в хранилище,
+        # и прерванная сверка продолжается с того же места
+        started = time.monotonic()
+        checkpoint = self.bot.store.load_checkpoint('reaction_roles')
+        if checkpoint and time.time() - checkpoint['started_at'] < Config.RECONCILE_RESUME_WINDOW:
+            started_at, done = checkpoint['started_at'], set(checkpoint['done'])
+        else:
+            started_at, done = time.time(), set()
+
+        guild = self.bot.get_guild(Config.GUILD_ID)
+        channel = guild.get_channel(Config.ALLOWED_CHANNEL_ID) if guild else None
+        if channel is None:
+            logging.warning("❌ Сверка ролей: сервер или канал поста не найден", extra={'guild': Config.GUILD_ID})
+            return
+        try:
+            message = await channel.fetch_message(Config.POST_ID)
+        except discord.HTTPException as e:
+            logging.error(f"❌ Сверка ролей: не удалось получить пост: {e}", extra={'guild': guild.id})
+            return
+
+        reactions = {str(reaction.emoji): reaction for reaction in message.reactions}
+        pending_adds = {}  # user_id -> выданные в этой сверке роли (кэш ролей ещё не обновился)
+        totals = {'added': 0, 'removed': 0, 'skipped': 0, 'failed': 0, 'missing': 0, 'interrupted': 0}
+        for emoji, role_id in Config.ROLES.items():
+            if emoji is None or emoji in done:
+                continue
+            role = self.get_role(guild, role_id)
+            if not role:
+                logging.warning(f"❌ Сверка ролей: роль для эмодзи {emoji} не найдена", extra={'guild': guild.id})
+                continue
+
+            # Нет реакции на посте (снята модератором, пост заменён) - не повод снимать роль у всех
+            reaction = reactions.get(emoji)
+            if reaction is None:
+                totals['missing'] += 1
+                logging.warning(f"⚠️ Сверка ролей: реакции {emoji} нет на посте - роль {role.name} пропущена",
+                                extra={'guild': guild.id, 'role_id': role.id})
+                continue
+
+            # Сбой API посреди обхода не должен обрывать всю сверку: роль остаётся
+            # не отмеченной в контрольной точке и доделывается следующим запуском
+            try:
+                reacted = await self._reaction_user_ids(reaction, emoji)
+                result = await self._apply_role_diff(guild, role, reacted, pending_adds)
+            except discord.HTTPException as e:
+                totals['interrupted'] += 1
+                logging.error(f"❌ Сверка ролей: {role.name} прервана ошибкой API: {e}",
+                              extra={'guild': guild.id, 'role_id': role.id})
+                continue
+            for key, value in result.items():
+                totals[key] += value
+
+            done.add(emoji)
+            self.bot.store.save_checkpoint('reaction_roles', {'started_at': started_at, 'done': sorted(done)})
+            logging.info(
+                f"🔄 Сверка ролей: {role.name} - реакций {len(reacted)}, выдано {result['added']}, "
+                f"снято {result['removed']} ({len(done)}/{len(Config.ROLES)})",
+                extra={'guild': guild.id, 'action': 'reconcile', 'role_id': role.id}
+            )
+
+        if totals['interrupted']:
+            self.bot.store.save_checkpoint('reaction_roles', {'started_at': started_at, 'done': sorted(done)})
+        else:
+            self.bot.store.delete_checkpoint('reaction_roles')
+        elapsed = time.monotonic() - started
+        summary = (f"выдано {totals['added']}, снято {totals['removed']}, пропущено по лимиту {totals['skipped']}, "
+                   f"ошибок {totals['failed']}, без реакции на посте {totals['missing']}, "
+                   f"прервано сбоем API {totals['interrupted']} за {elapsed:.0f} сек")
+        logging.info(f"✅ Сверка ролей ({reason}): {summary}", extra={'guild': guild.id, 'action': 'reconcile'})
+        self.bot.mod_log.add("🔄 Сверка ролей", f"{reason}: {summary}")
+
+    async def _reaction_user_ids(self, reaction, emoji):
+        # Постраничный обход поставивших реакцию (по 100 за запрос)
+        user_ids = set()
+        paged = 0
+        async for user in reaction.users(limit=None):
+            paged += 1
+            if not user.bot:
+                user_ids.add(user.id)
+            if paged % 1000 == 0:
+                logging.info(f"🔄 Сверка ролей: {emoji} - прочитано реакций {paged}/{reaction.count}", extra={'sample': 'reconcile_paging'})
+        return user_ids
+
+    async def _apply_role_diff(self, guild, role, reacted, pending_adds):
+        # Минимальный набор изменений, пачками через очередь действий (она же соблюдает лимиты API)
+        holders = {member.id for member in role.members}
+        result = {'added': 0, 'removed': 0, 'skipped': 0, 'failed': 0}
+        edits = []
+        for user_id in sorted(reacted - holders):
+            member = guild.get_member(user_id)
+            if not member or member.bot:
+                continue
+            if self.bot.permissions.counted_roles(member) + pending_adds.get(user_id, 0) >= Config.MAX_ROLES_PER_USER:
+                result['skipped'] += 1
+                continue
+            pending_adds[user_id] = pending_adds.get(user_id, 0) + 1
+            edits.append(('added', member, [role], ()))
+        for user_id in sorted(holders - reacted):
+            member = guild.get_member(user_id)
+            if member and not member.bot:
+                edits.append(('removed', member, (), [role]))
+
+        for start in range(0, len(edits), Config.RECONCILE_BATCH):
+            batch = edits[start:start + Config.RECONCILE_BATCH]
+            results = await asyncio.gather(
+                *(self.bot.dispatcher.edit_roles(member, add=add, remove=remove) for _, member, add, remove in batch),
+                return_exceptions=True
+            )
+            for (kind, *_), outcome in zip(batch, results):
+                result['failed' if isinstance(outcome, Exception) else kind] += 1
+        return result
+
+    def cog_unload(self):
+        if self.reconcile_task:
+            self.reconcile_task.cancel()
+
 async def setup(bot):
     await bot.add_cog(Roles(bot))
\ No newline at end of file
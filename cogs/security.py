@@ -1,224 +1,305 @@
 import discord
 from discord.ext import commands
 from config import Config
-from datetime import datetime
 import asyncio
-import speech_recognition as sr
 import logging
-import io
 import re
-from utils.audio import AudioAnalyzer
+from utils.audio import VoiceActivityDetector, to_pcm16
+from utils.speech import RecognitionPool, RecognitionError, drop_overlap_words
+from utils.banwords import BanWordWatcher
+from utils.logsink import LogSink
+from utils.permissions import is_moderator
+
+class SpeechStream:
+    # Распознавание речи одного голосового канала: читает общий микс сессии
+    # и хранит свою очередность фрагментов, чтобы каналы не смешивались
+    def __init__(self, session):
+        self.session = session
+        self.reader = session.mix.add_consumer()  # Каждый сэмпл читается один раз
+        self.vad = VoiceActivityDetector(session.mix.sample_rate)
+        self.utterance_seq = 0  # Номер следующего фрагмента на распознавание
+        self.next_result_seq = 0  # Номер фрагмента, чей текст обрабатывается следующим
+        self.pending_results = {}  # {номер: (фрагмент, текст)} - пришедшие раньше очереди
+        self.last_words = []  # Слова последнего фрагмента для удаления перекрытия
+
+    def detect_utterances(self):
+        # Новое аудио проходит через VAD, на распознавание идут только фрагменты с речью
+        self.session.mixer.flush()  # В тишине кадры не приходят - досводим по часам
+        parts, start = self.reader.read()
+        utterances = []
+        for part in parts:
+            utterances.extend(self.vad.process(part, start))
+            start += len(part)
+        sample_rate = self.session.mix.sample_rate
+        return [u._replace(audio=to_pcm16(u.audio, sample_rate)) for u in utterances]
 
 class VoiceSecurity(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.recognizer = sr.Recognizer()
-        self.audio_analyzer = AudioAnalyzer()
-        self.user_violations = {}
-        self.user_phrases = {}
-        self.last_phrase_time = {}
+        self.recognition = None  # Пул распознавания создаётся при загрузке модуля
+        self.recognition_tasks = set()
+        self.streams = {}  # {guild_id: SpeechStream} - по одному на голосовую сессию
+        self.vad_totals = {'frames_forwarded': 0, 'frames_dropped': 0, 'utterances': 0}  # Закрытых потоков
+        self.user_violations = {uid: int(count) for uid, count in self.bot.store.load_counters('violations').items()}
         self.processing_active = True
         self.word_pattern = re.compile(r'\w+', re.UNICODE)
+        self.ban_words = BanWordWatcher(Config.BAN_WORDS_FILE)
+        self._load_ban_words()
+        self.bot.scheduler.register('unban', self._unban_user)
+        self.warnings = LogSink(  # Предупреждения о нарушениях одной сводкой
+            bot, Config.ALLOWED_CHANNEL_ID, "⚠ Нарушения",
+            flush_interval=Config.LOG_FLUSH_INTERVAL,
+            max_events=Config.LOG_FLUSH_EVENTS
+        )
         print("🔹 Модуль голосовой безопасности инициализирован")
+
+    def _load_ban_words(self):
+        # Загрузка запрещенных слов
+        try:
+            count, elapsed = self.ban_words.load()
+            print(f"🔹 Загружено {count} запрещенных слов")
+            logging.info(f"Загружено {count} запрещенных слов за {elapsed * 1000:.0f} мс")
+        except FileNotFoundError:
+            error_msg = f"❌ Файл {Config.BAN_WORDS_FILE} не найден! Создайте файл со списком запрещенных слов."
+            logging.error(error_msg)
         
     async def cog_load(self):
-        self.audio_analyzer.start()
+        self.recognition = RecognitionPool()
         self.bot.loop.create_task(self.continuous_audio_processing())
-        print("🔹 Аудиоанализатор запущен")
+        self.bot.loop.create_task(self.watch_ban_words())
+        self.warnings.start()
+        print("🔹 Распознавание речи запущено")
+
+    async def watch_ban_words(self):
+        # Проверка изменения файла запрещенных слов
+        while self.processing_active:
+            await asyncio.sleep(Config.BAN_WORDS_POLL_INTERVAL)
+            if self.ban_words.changed():
+                await self.reload_ban_words("файл изменён")
+
+    async def reload_ban_words(self, reason):
+        # Пересборка списка в фоне с отчётом в лог-канал
+        try:
+            count, elapsed = await self.ban_words.reload(self.bot.executor)
+        except (OSError, UnicodeDecodeError) as e:
+            error_msg = f"❌ Не удалось перезагрузить запрещенные слова: {e}"
+            logging.error(error_msg)
+            return None
+
+        log_msg = f"🔄 Список запрещенных слов перезагружен ({reason}): {count} слов за {elapsed * 1000:.0f} мс"
+        logging.info(log_msg)
+        self.bot.mod_log.add("🔄 Запрещенные слова", f"Перезагружено ({reason}): {count} слов за {elapsed * 1000:.0f} мс")
+        return count
+
+    @commands.command(name='reload_banwords')
+    @is_moderator()
+    async def reload_banwords(self, ctx):
+        # Принудительная перезагрузка списка запрещенных слов
+        count = await self.reload_ban_words(f"команда {ctx.author.display_name}")
+        if count is None:
+            await ctx.send("❌ Не удалось перезагрузить список запрещенных слов", delete_after=10)
+        else:
+            await ctx.send(f"✅ Список запрещенных слов перезагружен: {count} слов")
         
     async def continuous_audio_processing(self):
         print("🔹 Начато непрерывное аудионаблюдение")
         while self.processing_active:
             try:
-                audio_data = await self._get_audio_data()
-                if audio_data:
-                    await self._process_audio(audio_data)
+                streams = self._sync_streams()
+                found = await asyncio.gather(*(self._get_utterances(stream) for stream in streams))
+                for stream, utterances in zip(streams, found):
+                    for utterance in utterances:
+                        await self._submit_audio(stream, utterance)
                 await asyncio.sleep(0.2)
             except Exception as e:
                 error_msg = f"❌ Ошибка обработки аудио: {e}"
-                print(error_msg)
-                logging.error(error_msg)
+                logging.error(error_msg, extra={'sample': 'audio_processing'})
                 await asyncio.sleep(1)
 
-    async def _get_audio_data(self):
-        # Получение аудиоданных
+    def _sync_streams(self):
+        # Потоки распознавания следуют за голосовыми сессиями бота
+        sessions = self.bot.voice_sessions
+        for guild_id in list(self.streams):
+            if sessions.get(guild_id) is not self.streams[guild_id].session:
+                self._close_stream(self.streams.pop(guild_id))
+        for guild_id, session in sessions.items():
+            if guild_id not in self.streams and session.is_connected():
+                self.streams[guild_id] = SpeechStream(session)
+        return list(self.streams.values())
+
+    def _close_stream(self, stream):
+        stats = stream.vad.stats()
+        for key in self.vad_totals:
+            self.vad_totals[key] += stats[key]
+
+    async def _get_utterances(self, stream):
+        # Получение высказываний из нового аудио; каналы анализируются параллельно в пуле
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(
             self.bot.executor,
-            self.audio_analyzer.get_audio_data,
-            2.0
+            stream.detect_utterances
         )
 
-    async def _process_audio(self, audio_data):
+    async def _submit_audio(self, stream, utterance):
+        # Отправка фрагмента в пул распознавания без ожидания результата
+        seq = stream.utterance_seq
+        stream.utterance_seq += 1
+        if self.recognition.saturated:
+            self.recognition.skipped += 1  # Все процессы заняты - фрагмент пропускаем
+            await self._deliver_result(stream, seq, utterance, None)
+            return
+        task = asyncio.create_task(self._process_audio(stream, seq, utterance))
+        self.recognition_tasks.add(task)
+        task.add_done_callback(self.recognition_tasks.discard)
+
+    async def _process_audio(self, stream, seq, utterance):
         # Обработка аудиофрагмента
+        text = None
         try:
-            loop = asyncio.get_running_loop()
-            text = await loop.run_in_executor(
-                self.bot.executor,
-                self._recognize_speech,
-                audio_data
-            )
-            
-            if text:
-                await self._process_text(text)
-                
-        except sr.UnknownValueError:
-            pass  # Не распознана речь - нормальная ситуация
-        except sr.RequestError as e:
-            error_msg = f"❌ Ошибка сервиса распознавания: {e}"
-            print(error_msg)
-            logging.error(error_msg)
+            text = await self.recognition.recognize(utterance.audio)
+        except RecognitionError as e:
+            error_msg = f"❌ {e}"
+            logging.error(error_msg, extra={'sample': 'recognition'})
         except Exception as e:
             error_msg = f"❌ Ошибка распознавания речи: {e}"
-            print(error_msg)
-            logging.error(error_msg)
+            logging.error(error_msg, extra={'sample': 'recognition'})
+        await self._deliver_result(stream, seq, utterance, text)
+
+    async def _deliver_result(self, stream, seq, utterance, text):
+        # Тексты канала обрабатываются в порядке фрагментов, даже если процессы вернули их вразнобой
+        stream.pending_results[seq] = (utterance, text)
+        while stream.next_result_seq in stream.pending_results:
+            utterance, text = stream.pending_results.pop(stream.next_result_seq)
+            stream.next_result_seq += 1
 
-    def _recognize_speech(self, audio_data):
-        # Распознавание речи
-        with io.BytesIO(audio_data) as audio_file:
-            with sr.AudioFile(audio_file) as source:
-                audio = self.recognizer.record(source)
-                return self.recognizer.recognize_google(audio, language="ru-RU").lower()
+            words = self.word_pattern.findall(text) if text else []
+            new_words = drop_overlap_words(stream.last_words, words) if utterance.continued else words
+            stream.last_words = words
+            if new_words:
+                await self._process_text(stream, utterance, " ".join(new_words))
 
-    async def _process_text(self, text):
+    async def _process_text(self, stream, utterance, text):
         # Обработка распознанного текста
-        if not self.bot.voice_clients:
+        if not stream.session.is_connected():
             return
             
-        voice_channel = self.bot.voice_clients[0].channel
-        active_user = self._get_most_active_user(voice_channel)
+        active_user = self._get_speaker(stream, utterance)
         if not active_user:
             return
         
-        current_time = datetime.now().timestamp()
+        # Проверяем только новые слова: перекрытие с прошлым фрагментом уже проверено
+        found = self.ban_words.matcher.find(self.word_pattern.findall(text))
         
-        # Проверка на новую фразу
-        if current_time - self.last_phrase_time.get(active_user.id, 0) > Config.PHRASE_TIMEOUT:
-            self.user_phrases[active_user.id] = []
-        
-        self.user_phrases[active_user.id].append(text)
-        self.last_phrase_time[active_user.id] = current_time
-        
-        full_phrase = " ".join(self.user_phrases[active_user.id])
-        spoken_words = self.word_pattern.findall(full_phrase)
-        found_banned_words = set(spoken_words) & set(BAN_WORDS)
-        
-        if found_banned_words:
-            await self._handle_violation(active_user, next(iter(found_banned_words)))
+        if found:
+            await self._handle_violation(active_user, found[1])
 
-    def _get_most_active_user(self, voice_channel):
-        # Определение самого активного пользователя
-        active_members = [m for m in voice_channel.members 
-                         if not m.bot and m.voice and not m.voice.self_mute and not m.voice.self_deaf]
-        
-        if not active_members:
+    def _get_speaker(self, stream, utterance):
+        # Говоривший - участник с наибольшей энергией голоса на отрезке высказывания
+        end = utterance.start + len(utterance.audio.data) // utterance.audio.sample_width
+        user_id = stream.session.speakers.dominant(utterance.start, end)
+        if user_id is None:
             return None
-            
-        active_members.sort(
-            key=lambda m: self.last_phrase_time.get(m.id, 0),
-            reverse=True
-        )
-        return active_members[0]
+        member = stream.session.channel.guild.get_member(user_id)
+        if not member or member.bot or not member.voice or member.voice.channel != stream.session.channel:
+            return None
+        return member
 
     async def _handle_violation(self, user, banned_word):
         # Обработка нарушения
         self.user_violations[user.id] = self.user_violations.get(user.id, 0) + 1
         violations = self.user_violations[user.id]
+        self.bot.store.set_counter('violations', user.id, violations)
         
         log_msg = f'⚠️ Пользователь {user.name} произнёс запрещённое слово "{banned_word}" (нарушение {violations}/{Config.MAX_BAN_WORDS})'
-        print(log_msg)
-        logging.info(log_msg)
-        
-        self.user_phrases[user.id] = []
+        logging.info(log_msg, extra={'user_id': user.id, 'guild': user.guild.id, 'action': 'violation', 'violations': violations})
         
         if violations >= Config.MAX_BAN_WORDS:
             await self._punish_user(user, banned_word)
         else:
-            channel = self.bot.get_channel(Config.ALLOWED_CHANNEL_ID)
-            if channel:
-                try:
-                    await channel.send(f"⚠ {user.mention}, не используйте запрещенные слова! Нарушение {violations}/{Config.MAX_BAN_WORDS}")
-                except discord.Forbidden:
-                    error_msg = f"❌ Нет прав отправлять сообщения в канал {Config.ALLOWED_CHANNEL_ID}"
-                    print(error_msg)
-                    logging.error(error_msg)
+            self.warnings.add(
+                f"Нарушение {violations}/{Config.MAX_BAN_WORDS}",
+                f"{user.mention}, не используйте запрещенные слова!",
+                mention=user.mention
+            )
 
     async def _punish_user(self, user, banned_word):
         # Наказание пользователя
         try:
             if not user.guild.me.guild_permissions.ban_members:
                 error_msg = "❌ У бота нет прав на бан пользователей!"
-                print(error_msg)
                 logging.error(error_msg)
                 channel = self.bot.get_channel(Config.ALLOWED_CHANNEL_ID)
                 if channel:
-                    await channel.send(f"❌ У меня нет прав забанить {user.mention} за нарушение правил!")
+                    await self.bot.dispatcher.send(channel, f"❌ У меня нет прав забанить {user.mention} за нарушение правил!")
                 return
                 
-            await user.ban(reason=f"Автоматический бан за повторные нарушения: {banned_word}", delete_message_days=0)
+            await self.bot.dispatcher.ban(user, reason=f"Автоматический бан за повторные нарушения: {banned_word}")
             self.user_violations.pop(user.id, None)
+            self.bot.store.delete_counter('violations', user.id)
             
             log_msg = f"⛔ Пользователь {user.name} забанен за использование запрещенных слов"
-            print(log_msg)
-            logging.info(log_msg)
+            logging.info(log_msg, extra={'user_id': user.id, 'guild': user.guild.id, 'action': 'ban'})
             
             channel = self.bot.get_channel(Config.ALLOWED_CHANNEL_ID)
             if channel:
-                await channel.send(f"⛔ {user.mention} получил бан за использование запрещенных слов.")
+                await self.bot.dispatcher.send(channel, f"⛔ {user.mention} получил бан за использование запрещенных слов.")
             
-            await asyncio.sleep(300)
-            try:
-                await user.guild.unban(user)
-                log_msg = f"✅ Пользователь {user.name} автоматически разбанен"
-                print(log_msg)
-                logging.info(log_msg)
-                if channel:
-                    await channel.send(f"✅ {user.name} был автоматически разбанен.")
-            except discord.Forbidden:
-                error_msg = f"❌ Нет прав на разбан пользователя {user.name}"
-                print(error_msg)
-                logging.error(error_msg)
-                if channel:
-                    await channel.send(f"❌ Не удалось разбанить {user.name} - нет прав!")
+            # Разбан по сроку через общий планировщик, обработчик нарушения не ждёт
+            self.bot.scheduler.schedule(
+                ('unban', user.guild.id, user.id), 'unban', Config.BAN_DURATION,
+                {'guild_id': user.guild.id, 'user_id': user.id, 'name': user.name}
+            )
             
         except discord.Forbidden:
             error_msg = f"❌ Нет прав забанить пользователя {user.name}"
-            print(error_msg)
-            logging.error(error_msg)
+            logging.error(error_msg, extra={'user_id': user.id, 'guild': user.guild.id, 'action': 'ban'})
             channel = self.bot.get_channel(Config.ALLOWED_CHANNEL_ID)
             if channel:
-                await channel.send(f"❌ Не удалось забанить {user.mention} - нет прав!")
+                await self.bot.dispatcher.send(channel, f"❌ Не удалось забанить {user.mention} - нет прав!")
         except Exception as e:
             error_msg = f"❌ Ошибка при бане пользователя {user.name}: {e}"
-            print(error_msg)
-            logging.error(error_msg)
+            logging.error(error_msg, extra={'user_id': user.id, 'guild': user.guild.id, 'action': 'ban'})
 
-    @commands.Cog.listener()
-    async def on_voice_state_update(self, member, before, after):
-        # Обновление статуса голосового подключения
-        if member.bot:
+    async def _unban_user(self, payload):
+        # Автоматический разбан (вызывается планировщиком)
+        name = payload['name']
+        guild = self.bot.get_guild(payload['guild_id'])
+        if guild is None:
             return
-            
-        if after.channel and (not after.self_mute and not after.self_deaf):
-            self.last_phrase_time[member.id] = datetime.now().timestamp()
+        channel = self.bot.get_channel(Config.ALLOWED_CHANNEL_ID)
+        try:
+            await self.bot.dispatcher.unban(guild, discord.Object(id=payload['user_id']))
+            log_msg = f"✅ Пользователь {name} автоматически разбанен"
+            logging.info(log_msg, extra={'user_id': payload['user_id'], 'guild': guild.id, 'action': 'unban'})
+            if channel:
+                await self.bot.dispatcher.send(channel, f"✅ {name} был автоматически разбанен.")
+        except discord.NotFound:
+            pass  # Уже разбанен вручную
+        except discord.Forbidden:
+            error_msg = f"❌ Нет прав на разбан пользователя {name}"
+            logging.error(error_msg, extra={'user_id': payload['user_id'], 'guild': guild.id, 'action': 'unban'})
+            if channel:
+                await self.bot.dispatcher.send(channel, f"❌ Не удалось разбанить {name} - нет прав!")
 
     async def cog_unload(self):
         # Выгрузка модуля
+        self.bot.scheduler.unregister('unban')
         self.processing_active = False
-        self.audio_analyzer.stop()
+        await self.warnings.close()
+        for stream in self.streams.values():
+            self._close_stream(stream)
+        self.streams.clear()
+        stats = self.vad_totals
+        total = stats['frames_forwarded'] + stats['frames_dropped']
+        logging.info(
+            f"VAD: передано кадров {stats['frames_forwarded']}, отброшено {stats['frames_dropped']} "
+            f"({stats['frames_dropped'] / total if total else 0:.0%}), высказываний {stats['utterances']}"
+        )
+        for task in self.recognition_tasks:
+            task.cancel()
+        if self.recognition:
+            self.recognition.shutdown()
         print("🔹 Модуль голосовой безопасности выгружен")
 
-# Загрузка запрещенных слов
-try:
-    with open('ban_words.txt', 'r', encoding='utf-8') as f:
-        BAN_WORDS = {word.strip().lower() for word in f.readlines() if word.strip()}
-    print(f"🔹 Загружено {len(BAN_WORDS)} запрещенных слов")
-    logging.info(f"Загружено {len(BAN_WORDS)} запрещенных слов")
-except FileNotFoundError:
-    error_msg = "❌ Файл ban_words.txt не найден! Создайте файл со списком запрещенных слов."
-    print(error_msg)
-    logging.error(error_msg)
-    BAN_WORDS = set()
-
 async def setup(bot):
     await bot.add_cog(VoiceSecurity(bot))
\ No newline at end of file
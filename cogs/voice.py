@@ -1,30 +1,34 @@
 import discord
 from discord.ext import commands
 from config import Config
-from datetime import datetime, timedelta
+from datetime import datetime
 import asyncio
 import logging
+import time
 import numpy as np
-from utils.audio import AudioAnalyzer
+from utils.audio import calculate_volumes_batch, shared_volume_jobs, shared_block_energies, apply_block_energies
+from utils.voice_receive import ReceivingVoiceClient
+from utils.voice_session import VoiceSession
 
 class VoiceMod(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.voice_client = None
-        self.user_data = {}  # Для анализа громкости
-        self.mute_tasks = {}  # Для автоматического снятия мута
-        self.last_mute_time = {}  # Время последнего мута
+        self.sessions = bot.voice_sessions  # {guild_id: VoiceSession} - по каналу на сервер
+        self.last_mute_time = {  # Время последнего мута
+            uid: datetime.fromtimestamp(ts) for uid, ts in self.bot.store.load_counters('last_mute').items()
+        }
         self.last_print_time = {}
-        self.CHECK_INTERVAL = 0.5
         self.MAX_DECIBEL = Config.MAX_DECIBEL
         self.MUTE_DURATION = Config.MUTE_DURATION
         self.DB_CALIBRATION = Config.DB_CALIBRATION
         
+        self.bot.scheduler.register('volume_unmute', self.remove_mute_after_delay)
+
         # Удаляем стандартную команду !help
         if self.bot.help_command:
             self.bot.help_command = None
         
-        # Словарь команд и их обработчиков
+        # Словарь команд и их обработчиков (разбор сообщений - в bot.router)
         self.commands = {
             "help": self.cmd_help,
             "status": self.cmd_status,
@@ -34,21 +38,15 @@ class VoiceMod(commands.Cog):
             "join": self.cmd_join,
             "leave": self.cmd_leave,
         }
+        for name, handler in self.commands.items():
+            self.bot.router.register(
+                name, handler,
+                check=self.bot.check_permissions,
+                denied="❌ У вас нет прав для выполнения этой команды."
+            )
         
         print("🔹 Модуль голосовой модерации инициализирован")
 
-    async def process_command(self, ctx, command, args):
-        # Обработка команд через словарь
-        if command not in self.commands:
-            return False
-            
-        if not await self.bot.check_permissions(ctx.message):
-            await ctx.send("❌ У вас нет прав для выполнения этой команды.", delete_after=5.0)
-            return True
-            
-        await self.commands[command](ctx, args)
-        return True
-
     async def cmd_help(self, ctx, args):
         # Показывает справку по командам
         help_text = """
@@ -62,6 +60,8 @@ class VoiceMod(commands.Cog):
         `!set_calibration <значение>` – Установить калибровку микрофона (dB)
         `!mute <@пользователь>` – Замьютить пользователя в этом голосовом канале
         `!unmute <@пользователь>` – Размьютить пользователя в голосовых каналах
+        `!reload_banwords` – Перезагрузить список запрещённых слов
+        `!reconcile_roles` – Сверить роли с реакциями на посте
         """
         await ctx.send(help_text)
 
@@ -72,10 +72,23 @@ class VoiceMod(commands.Cog):
             f"• Порог громкости: {self.MAX_DECIBEL} dB\n"
             f"• Длительность мута: {self.MUTE_DURATION} сек\n"
             f"• Калибровка микрофона: {self.DB_CALIBRATION} dB\n"
-            f"• Мониторинг канала: {self.voice_client.channel.name if self.voice_client else 'Не активен'}"
+            f"• Мониторинг каналов: {', '.join(s.channel.name for s in self.sessions.values()) or 'Не активен'}\n"
+            f"• Очередь действий: {self.format_dispatch_stats()}\n"
+            f"• Кэш ролей: {self.format_role_cache_stats()}"
         )
         await ctx.send(status_msg)
 
+    def format_dispatch_stats(self):
+        stats = self.bot.dispatcher.stats()
+        depth = ', '.join(f"{name} {count}" for name, count in stats['depth'].items())
+        return (f"{depth}; выполнено {stats['executed']}, схлопнуто {stats['coalesced']}, "
+                f"ошибок {stats['failed']}, ожидание p95 {stats['wait_p95'] * 1000:.0f} мс")
+
+    def format_role_cache_stats(self):
+        stats = self.bot.role_cache.stats()
+        return (f"{stats['size']} ролей, попаданий {stats['hits']} ({stats['hit_ratio']:.0%}), "
+                f"промахов {stats['misses']}, сбросов {stats['invalidations']}")
+
     async def cmd_set_threshold(self, ctx, args):
         # Устанавливает порог громкости
         try:
@@ -141,87 +154,83 @@ class VoiceMod(commands.Cog):
                 return
             target_channel = ctx.author.voice.channel
             
-        if self.voice_client and self.voice_client.is_connected():
-            if self.voice_client.channel == target_channel:
+        # Discord допускает одно голосовое подключение на сервер - сессия на сервер
+        session = self.sessions.get(target_channel.guild.id)
+        if session and session.is_connected():
+            if session.channel == target_channel:
                 await ctx.send("ℹ️ Бот уже в этом канале")
                 return
-            await self.voice_client.move_to(target_channel)
+            await session.voice_client.move_to(target_channel)
+            session.moved()
             await ctx.send(f"✅ Перемещён в {target_channel.name}")
             return
+        if session:
+            session.stop()  # Подключение было потеряно
             
-        self.voice_client = await target_channel.connect()
+        voice_client = await target_channel.connect(cls=ReceivingVoiceClient)
+        session = self.sessions[target_channel.guild.id] = VoiceSession(self.bot, voice_client)
+        session.start()
+        session.monitor_task = self.bot.loop.create_task(self.monitor_voice_activity(session))
         await ctx.send(f"✅ Подключился к {target_channel.name}")
-        self.bot.loop.create_task(self.monitor_voice_activity())
         print(f"🔹 Подключение к голосовому каналу {target_channel.name}")
 
     async def cmd_leave(self, ctx, args):
-        # Отключает бота от голосового канала
-        if not self.voice_client or not self.voice_client.is_connected():
+        # Отключает бота от голосового канала этого сервера
+        session = self.sessions.pop(ctx.guild.id, None)
+        if not session or not session.is_connected():
             await ctx.send("ℹ️ Бот не подключён к голосовому каналу")
             return
 
-        await self.voice_client.disconnect()
-        self.voice_client = None
+        session.stop()
+        await session.voice_client.disconnect()
         await ctx.send("✅ Бот отключён от голосового канала")
         print("🔹 Отключение от голосового канала")
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        # Обработчик сообщений для команд
-        if message.author.bot or not message.content.startswith('!'):
-            return
-
-        parts = message.content.split()
-        command = parts[0][1:].lower()
-        args = parts[1:] if len(parts) > 1 else []
-
-        await self.process_command(await self.bot.get_context(message), command, args)
-        
 # Мониторинг громкости ===
-    async def monitor_voice_activity(self):
-        # Мониторинг громкости пользователей
-        while self.voice_client and self.voice_client.is_connected():
+    async def monitor_voice_activity(self, session):
+        # Мониторинг громкости канала: просыпается только по сигналам анализаторов о новом аудио.
+        # У каждой сессии свой цикл и не больше одного задания в пуле за раз
+        while session.is_connected():
             try:
-                current_time = datetime.now()
+                ready = {await session.audio_events.get()}
+                while not session.audio_events.empty():  # Всё, что накопилось, - одним заданием
+                    ready.add(session.audio_events.get_nowait())
+                if None in ready:
+                    break
                 
-                # Обрабатываем автоматический мут за громкость
-                for member in self.voice_client.channel.members:
-                    if member.bot or member.voice.deaf or member.voice.mute:
-                        continue
-                    
-                    await self.process_member_volume(member, current_time)
+                active = {
+                    user_id: session.user_data[user_id] for user_id in ready
+                    if user_id in session.active_users and user_id in session.user_data
+                }
+                for user in active.values():
+                    user['analyzer'].block_done()
+                if not active:
+                    continue
                 
-                await self.cleanup_inactive_users()
-                await asyncio.sleep(self.CHECK_INTERVAL)
+                volumes = await self._calculate_volumes(active)
+                current_time = datetime.now()
+                for user_id, volume in volumes.items():
+                    active[user_id]['last_update'] = current_time
+                    await self._check_volume_threshold(active[user_id], volume, current_time)
                 
             except Exception as e:
-                print(f"❌ Ошибка мониторинга: {e}")
-                await asyncio.sleep(5)
+                logging.error(f"❌ Ошибка мониторинга: {e}", extra={'sample': f'voice_monitor:{session.guild_id}'})
+                await asyncio.sleep(1)
 
-    async def process_member_volume(self, member, current_time):
-        # Обрабатывает громкость пользователя
-        if member.id not in self.user_data:
-            self.user_data[member.id] = {
-                'analyzer': AudioAnalyzer(),
-                'member': member,
-                'last_update': current_time,
-                'is_muted': False
-            }
-            self.user_data[member.id]['analyzer'].start()
-        
-        user = self.user_data[member.id]
-        user['last_update'] = current_time
-        
-        volume = await self._calculate_volume(user)
-        await self._check_volume_threshold(user, volume, current_time)
-
-    async def _calculate_volume(self, user_data):
-        # Расчёт громкости
+    async def _calculate_volumes(self, active):
+        # Расчёт громкости всех активных пользователей одним заданием
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            self.bot.executor,
-            user_data['analyzer'].calculate_volume
+        analyzers = {user_id: user['analyzer'] for user_id, user in active.items()}
+        if self.bot.audio_pool is None:
+            return await loop.run_in_executor(self.bot.executor, calculate_volumes_batch, analyzers)
+        
+        # Процессы читают аудио из разделяемой памяти, обратно приходят только суммы квадратов
+        results = await loop.run_in_executor(
+            self.bot.audio_pool,
+            shared_block_energies,
+            shared_volume_jobs(analyzers)
         )
+        return apply_block_energies(analyzers, results)
 
     async def _check_volume_threshold(self, user_data, volume, current_time):
         # Проверка превышения порога громкости
@@ -236,84 +245,90 @@ class VoiceMod(commands.Cog):
         # Применение мута
         try:
             member = user_data['member']
-            await member.edit(mute=True)
+            started = time.monotonic()
+            await self.bot.dispatcher.set_mute(member, True)
             user_data['is_muted'] = True
             self.last_mute_time[member.id] = datetime.now()
+            self.bot.store.set_counter('last_mute', member.id, self.last_mute_time[member.id].timestamp())
             
             msg = f"⚠️ МУТ: {member.display_name} ({volume:.1f} dB > {Config.MAX_DECIBEL} dB)"
-            print(msg)
-            logging.info(msg)
+            logging.info(msg, extra={
+                'user_id': member.id, 'guild': member.guild.id, 'action': 'mute',
+                'db': volume, 'latency': time.monotonic() - started
+            })
             
-            channel = self.bot.get_channel(Config.LOG_CHANNEL_ID)
-            if channel:
-                embed = discord.Embed(
-                    title="🔊 Превышение громкости",
-                    description=f"{member.mention} был заглушен",
-                    color=discord.Color.red()
-                )
-                embed.add_field(name="Средняя громкость", value=f"{volume:.1f} dB")
-                embed.add_field(name="Порог", value=f"{Config.MAX_DECIBEL} dB")
-                await channel.send(embed=embed)
+            self.bot.mod_log.add(
+                "🔊 Превышение громкости",
+                f"{member.mention} был заглушен: {volume:.1f} dB (порог {Config.MAX_DECIBEL} dB)"
+            )
 
-            self.mute_tasks[member.id] = self.bot.loop.create_task(
-                self.remove_mute_after_delay(user_data))
+            self.bot.scheduler.schedule(
+                ('volume_unmute', member.guild.id, member.id), 'volume_unmute', Config.MUTE_DURATION,
+                {'guild_id': member.guild.id, 'user_id': member.id}
+            )
             
         except Exception as e:
             error_msg = f"❌ Ошибка мута {user_data['member'].display_name}: {e}"
-            print(error_msg)
-            logging.error(error_msg)
+            logging.error(error_msg, extra={'user_id': user_data['member'].id, 'action': 'mute', 'db': volume})
 
-    async def remove_mute_after_delay(self, user_data):
-        # Снятие мута после задержки
-        await asyncio.sleep(Config.MUTE_DURATION)
+    async def remove_mute_after_delay(self, payload):
+        # Снятие мута по истечении срока (вызывается планировщиком)
+        session = self.sessions.get(payload['guild_id'])
+        user_data = session.user_data.get(payload['user_id']) if session else None
+        if user_data is None:
+            await self.remove_orphan_mute(payload)
+            return
         try:
             member = user_data['member']
-            await member.edit(mute=False)
+            await self.bot.dispatcher.set_mute(member, False)
             user_data['is_muted'] = False
             user_data['analyzer'].reset_history()
             
             msg = f"🔇 Снятие мута: {member.display_name}"
-            print(msg)
-            logging.info(msg)
+            logging.info(msg, extra={'user_id': member.id, 'guild': member.guild.id, 'action': 'unmute'})
         except Exception as e:
             error_msg = f"❌ Ошибка снятия мута {user_data['member'].display_name}: {e}"
-            print(error_msg)
-            logging.error(error_msg)
-        finally:
-            if member.id in self.mute_tasks:
-                del self.mute_tasks[member.id]
+            logging.error(error_msg, extra={'user_id': payload['user_id'], 'action': 'unmute'})
 
-    async def cleanup_inactive_users(self):
-        # Очистка неактивных пользователей
-        current_time = datetime.now()
-        inactive_users = [
-            uid for uid, data in self.user_data.items()
-            if (current_time - data['last_update']) > timedelta(seconds=10)
-            and not data['is_muted']
-        ]
-        
-        for uid in inactive_users:
-            if uid in self.mute_tasks:
-                self.mute_tasks[uid].cancel()
-                del self.mute_tasks[uid]
-            
-            self.user_data[uid]['analyzer'].stop()
-            del self.user_data[uid]
+    async def remove_orphan_mute(self, payload):
+        # Мут без данных анализа (например, после перезапуска) снимаем напрямую
+        guild = self.bot.get_guild(payload['guild_id'])
+        member = guild.get_member(payload['user_id']) if guild else None
+        if not member or not member.voice or not member.voice.mute:
+            return
+        try:
+            await self.bot.dispatcher.set_mute(member, False)
+            msg = f"🔇 Снятие мута: {member.display_name}"
+            logging.info(msg, extra={'user_id': member.id, 'guild': guild.id, 'action': 'unmute'})
+        except discord.HTTPException as e:
+            error_msg = f"❌ Ошибка снятия мута {member.display_name}: {e}"
+            logging.error(error_msg, extra={'user_id': member.id, 'guild': guild.id, 'action': 'unmute'})
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
-        # Обрабатывает изменения голосового состояния
+        # Набор активных участников поддерживается по событиям, без обхода канала
         if member.bot:
             return
         
+        session = self.sessions.get(member.guild.id)
+        if session is None:
+            return
+        
         # Обработка автоматического мута
         if before.channel and not after.channel:
-            if member.id in self.user_data:
-                if member.id in self.mute_tasks:
-                    self.mute_tasks[member.id].cancel()
-                    del self.mute_tasks[member.id]
-                self.user_data[member.id]['analyzer'].stop()
-                del self.user_data[member.id]
+            if member.id in session.user_data:
+                self.bot.scheduler.cancel(('volume_unmute', member.guild.id, member.id))
+            session.forget_member(member.id)
+            return
+        
+        session.update_member(member)
+
+    async def cog_unload(self):
+        # Выгрузка модуля
+        self.bot.scheduler.unregister('volume_unmute')
+        self.bot.router.unregister(*self.commands)
+        for session in self.sessions.values():
+            session.stop()
 
 async def setup(bot):
     await bot.add_cog(VoiceMod(bot))
\ No newline at end of file
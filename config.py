@@ -13,6 +13,12 @@ class Config:
     POST_ID = int(os.getenv('POST_ID'))
     ALLOWED_CHANNEL_ID = int(os.getenv('ALLOWED_CHANNEL_ID'))
     MAX_ROLES_PER_USER = int(os.getenv('MAX_ROLES_PER_USER', 5))
+    FLOOD_RATE = float(os.getenv('FLOOD_RATE', 0.5))  # Реакций в секунду на ключ антифлуда
+    FLOOD_BURST = int(os.getenv('FLOOD_BURST', 1))  # Допустимый всплеск реакций
+    FLOOD_SCOPE = os.getenv('FLOOD_SCOPE', 'user')  # user, channel или guild
+    FLOOD_MAX_KEYS = int(os.getenv('FLOOD_MAX_KEYS', 100000))  # Предел отслеживаемых ключей
+    RECONCILE_BATCH = int(os.getenv('RECONCILE_BATCH', 50))  # Изменений ролей в одной пачке сверки
+    RECONCILE_RESUME_WINDOW = int(os.getenv('RECONCILE_RESUME_WINDOW', 3600))  # Сверка продолжается, если прервана не раньше (сек)
     ROLES = {
         os.getenv('EMOJI_1'): int(os.getenv('ROLE_ID_1')),
         os.getenv('EMOJI_2'): int(os.getenv('ROLE_ID_2')),
@@ -26,11 +32,48 @@ class Config:
     MUTE_DURATION = int(os.getenv('MUTE_DURATION', 10))
     LOG_CHANNEL_ID = int(os.getenv('LOG_CHANNEL_ID'))
     DB_CALIBRATION = float(os.getenv('DB_CALIBRATION', 0))
+    LOG_FILE = os.getenv('LOG_FILE', 'bot.log')
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))  # Ротация файла журнала
+    LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', 5))
+    LOG_SAMPLE_INTERVAL = float(os.getenv('LOG_SAMPLE_INTERVAL', 10))  # Частые записи не чаще раза в N сек
+    LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', 10))  # Сводка журнала не чаще (сек)
+    LOG_FLUSH_EVENTS = int(os.getenv('LOG_FLUSH_EVENTS', 10))  # или при накоплении событий (до 25)
+    VOLUME_BLOCK_SECONDS = float(os.getenv('VOLUME_BLOCK_SECONDS', 0.1))  # Новое аудио, после которого проверяется громкость
+    EXECUTOR_WORKERS = int(os.getenv('EXECUTOR_WORKERS', 0))  # Потоки анализа аудио (0 - по числу ядер)
+    AUDIO_PROCESS_WORKERS = int(os.getenv('AUDIO_PROCESS_WORKERS', 0))  # Процессы анализа громкости (0 - в потоках)
+    WARMUP_KERNELS = bool(int(os.getenv('WARMUP_KERNELS', 1)))  # Подготовка ядер numba при запуске (0 - выкл.)
+    VOLUME_WINDOW = float(os.getenv('VOLUME_WINDOW', 10))  # Длинное окно громкости (сек)
+    VOLUME_SHORT_WINDOW = float(os.getenv('VOLUME_SHORT_WINDOW', 0.5))  # Короткое окно (сек)
+    VOLUME_EMA_SECONDS = float(os.getenv('VOLUME_EMA_SECONDS', 0))  # Постоянная EMA, 0 - выключено
+    RECEIVE_QUEUE_SIZE = int(os.getenv('RECEIVE_QUEUE_SIZE', 2000))  # Очередь входящих голосовых пакетов
+    VOICE_DUMP_PATH = os.getenv('VOICE_DUMP_PATH')  # Запись дампа пакетов для воспроизведения
     
     # Настройки безопасности
     SAMPLE_RATE = 48000
     BUFFER_SECONDS = 10
     MIN_AUDIO_LENGTH = 1
     MAX_BAN_WORDS = 3
-    PHRASE_TIMEOUT = 3.0
-    MODERATOR_ROLE = os.getenv('MODERATOR_ROLE', 'Генсек')
\ No newline at end of file
+    BAN_WORDS_FILE = os.getenv('BAN_WORDS_FILE', 'ban_words.txt')
+    BAN_WORDS_POLL_INTERVAL = float(os.getenv('BAN_WORDS_POLL_INTERVAL', 5))  # Проверка изменений файла (сек)
+    VAD_ENERGY_DB = float(os.getenv('VAD_ENERGY_DB', -45))  # Порог энергии речи (dBFS)
+    VAD_MAX_ZCR = float(os.getenv('VAD_MAX_ZCR', 0.35))  # Выше - тихий кадр считается шумом
+    VAD_HANGOVER_MS = int(os.getenv('VAD_HANGOVER_MS', 300))  # Тишина, завершающая высказывание
+    VAD_MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', 150))  # Более короткие всплески отбрасываются
+    VAD_MAX_UTTERANCE = float(os.getenv('VAD_MAX_UTTERANCE', 5.0))  # Максимальная длина фрагмента (сек)
+    ASR_OVERLAP_MS = int(os.getenv('ASR_OVERLAP_MS', 300))  # Перекрытие соседних фрагментов длинной речи
+    MODERATOR_ROLE = os.getenv('MODERATOR_ROLE', 'Генсек')
+    BAN_DURATION = int(os.getenv('BAN_DURATION', 300))  # Длительность автоматического бана (сек)
+    SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', 4))  # Обработчики истекших сроков
+    STATE_DB_PATH = os.getenv('STATE_DB_PATH', 'state.db')  # SQLite с состоянием модерации
+    STATE_FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', 0.2))  # Накопление пачки записи (сек)
+    DISPATCH_RATE = float(os.getenv('DISPATCH_RATE', 5))  # Запросов в секунду на маршрут API
+    DISPATCH_BURST = int(os.getenv('DISPATCH_BURST', 5))  # Допустимый всплеск на маршрут
+    DISPATCH_CONCURRENCY = int(os.getenv('DISPATCH_CONCURRENCY', 4))  # Одновременных запросов
+    
+    # Настройки распознавания речи
+    ASR_BACKEND = os.getenv('ASR_BACKEND', 'google')  # google, vosk (офлайн) или stub (тесты)
+    ASR_LANGUAGE = os.getenv('ASR_LANGUAGE', 'ru-RU')
+    ASR_WORKERS = int(os.getenv('ASR_WORKERS', 0))  # 0 - по числу ядер
+    VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH', 'models/vosk-model-small-ru')
+    ASR_STUB_TEXT = os.getenv('ASR_STUB_TEXT', '')
\ No newline at end of file
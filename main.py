@@ -7,18 +7,27 @@ import logging
 import cProfile
 import pstats
 import concurrent.futures
+import multiprocessing
+from utils.logs import setup_logging
+from utils.scheduler import ExpiryScheduler
+from utils.storage import StateStore
+from utils.dispatcher import ActionDispatcher
+from utils.logsink import LogSink
+from utils.router import CommandRouter
+from utils.permissions import PermissionIndex
+from utils.rolecache import RoleCache
 
 # Настройка многопоточности для numpy
 os.environ["OMP_NUM_THREADS"] = "4"
 os.environ["MKL_NUM_THREADS"] = "4"
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+# Запись журнала в фоновом потоке с ротацией файла
+log_listener = setup_logging(
+    Config.LOG_FILE,
+    level=Config.LOG_LEVEL,
+    max_bytes=Config.LOG_MAX_BYTES,
+    backups=Config.LOG_BACKUPS,
+    sample_interval=Config.LOG_SAMPLE_INTERVAL
 )
 
 intents = discord.Intents.default()
@@ -33,16 +42,108 @@ class MyBot(commands.Bot):
             intents=intents,
             activity=discord.Game(name="Модерация сервера")
         )
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        # Ядра numba отпускают GIL, поэтому анализ каналов масштабируется по числу ядер
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=Config.EXECUTOR_WORKERS or os.cpu_count())
+        self.audio_pool = concurrent.futures.ProcessPoolExecutor(  # Анализ громкости вне GIL основного процесса
+            max_workers=Config.AUDIO_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        ) if Config.AUDIO_PROCESS_WORKERS else None
+        self.voice_sessions = {}  # {guild_id: VoiceSession} - мониторинг голосовых каналов
+        self.store = StateStore(Config.STATE_DB_PATH, flush_interval=Config.STATE_FLUSH_INTERVAL)
+        self.scheduler = ExpiryScheduler(workers=Config.SCHEDULER_WORKERS, store=self.store)  # Сроки мутов и банов
+        self.timers_restored = False
+        self.dispatcher = ActionDispatcher(  # Исходящие действия Discord
+            rate=Config.DISPATCH_RATE,
+            burst=Config.DISPATCH_BURST,
+            concurrency=Config.DISPATCH_CONCURRENCY
+        )
+        self.mod_log = LogSink(  # Сводки событий в канал журнала
+            self, Config.LOG_CHANNEL_ID, "📋 Журнал модерации",
+            flush_interval=Config.LOG_FLUSH_INTERVAL,
+            max_events=Config.LOG_FLUSH_EVENTS
+        )
         self.allowed_channel_id = Config.ALLOWED_CHANNEL_ID
-        self.required_role = "Генсек"
+        self.router = CommandRouter(self, Config.PREFIX, self.allowed_channel_id)  # Команды всех модулей
+        self.permissions = PermissionIndex(Config.MODERATOR_ROLE, Config.EXCROLES)  # Роли по ID
+        self.role_cache = RoleCache()  # Роли реакций по (guild_id, role_id)
 
     async def setup_hook(self):
+        self.scheduler.start()
+        self.dispatcher.start()
+        self.mod_log.start()
         await self.load_extension('cogs.roles')
         await self.load_extension('cogs.voice')
         await self.load_extension('cogs.security')
         await self.load_extension('cogs.moderation')
+        self.router.refresh()
         print("✅ Все модули загружены")
+        if Config.WARMUP_KERNELS:
+            from utils.audio import warmup_kernels  # Модуль уже загружен голосовыми модулями
+            elapsed = await self.loop.run_in_executor(self.executor, warmup_kernels)
+            logging.info(f"Ядра анализа аудио готовы за {elapsed * 1000:.0f} мс")
+
+    async def on_ready(self):
+        # Роли модераторов по имени разрешаются в ID (заново после переподключения);
+        # объекты серверов могли быть пересозданы - кэш ролей собирается заново
+        self.role_cache.clear()
+        for guild in self.guilds:
+            self.permissions.load_guild(guild)
+            self.role_cache.preload(guild, Config.ROLES.values())
+        # Сроки восстанавливаются, когда кэш серверов уже заполнен
+        if not self.timers_restored:
+            self.timers_restored = True
+            count = self.scheduler.restore()
+            print(f"🔹 Восстановлено сроков наказаний: {count}")
+            logging.info(f"Восстановлено сроков наказаний: {count}")
+
+    # Индекс прав и кэш ролей следуют за событиями о серверах, ролях и участниках
+    async def on_guild_join(self, guild):
+        self.permissions.load_guild(guild)
+
+    async def on_guild_remove(self, guild):
+        self.permissions.forget_guild(guild)
+        self.role_cache.forget_guild(guild.id)
+
+    async def on_guild_available(self, guild):
+        self.permissions.load_guild(guild)
+        self.role_cache.forget_guild(guild.id)
+
+    async def on_guild_unavailable(self, guild):
+        self.role_cache.forget_guild(guild.id)
+
+    async def on_guild_role_create(self, role):
+        self.permissions.role_updated(role)
+        self.role_cache.invalidate(role)
+
+    async def on_guild_role_update(self, before, after):
+        if before.name != after.name:
+            self.permissions.role_updated(after)
+        self.role_cache.invalidate(after)
+
+    async def on_guild_role_delete(self, role):
+        self.permissions.role_deleted(role)
+        self.role_cache.invalidate(role)
+
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self.permissions.member_updated(after)
+
+    async def on_member_remove(self, member):
+        self.permissions.member_removed(member)
+
+    async def close(self):
+        # Журналы отправляются до закрытия соединения (выгрузка модулей - в super().close())
+        await self.scheduler.stop()
+        await self.mod_log.close()
+        await super().close()
+        await self.dispatcher.stop()
+        self.store.close()
+        if self.audio_pool:
+            self.audio_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def on_message(self, message):
+        # Вместо process_commands: сообщение разбирается один раз для всех модулей
+        await self.router.dispatch(message)
 
     async def check_permissions(self, message):
         # Проверка канала
@@ -51,8 +152,7 @@ class MyBot(commands.Bot):
         
         # Проверка роли (только для участников сервера)
         if isinstance(message.author, discord.Member):
-            return any(role.name.lower() == self.required_role.lower() 
-                     for role in message.author.roles)
+            return self.permissions.is_moderator(message.author)
         return False  # Не участник сервера или нет роли
 
 async def main():
@@ -91,4 +191,5 @@ if __name__ == '__main__':
         stats.sort_stats(pstats.SortKey.TIME)
         print("\n🔹 Профилирование производительности:")
         stats.print_stats(20)
-        print("🔹 Бот завершил работу")
\ No newline at end of file
+        print("🔹 Бот завершил работу")
+        log_listener.stop()
\ No newline at end of file
@@ -1,17 +1,70 @@
-from datetime import datetime, timedelta
+from collections import OrderedDict
 import logging
+import time
+from utils.dispatcher import TokenBucket
+
+# Поле события реакции, по которому считается лимит
+SCOPES = {'user': 'user_id', 'channel': 'channel_id', 'guild': 'guild_id'}
 
 class AntiFlood:
-    def __init__(self, cooldown=2):
-        self.last_actions = {}
-        self.cooldown = cooldown
-        print(f"🔹 Антифлуд система инициализирована (задержка {cooldown} сек)")
-    
-    async def check_flood(self, user_id):
-        now = datetime.now()
-        if user_id in self.last_actions:
-            if (now - self.last_actions[user_id]).total_seconds() < self.cooldown:
-                logging.warning(f'Обнаружен флуд от пользователя {user_id}')
-                return True
-        self.last_actions[user_id] = now
-        return False
\ No newline at end of file
+    # Токен-бакет на ключ (пользователь, канал или сервер) с ограниченной памятью:
+    # бакеты хранятся в порядке последней активности, давно не тронутые (уже полные)
+    # удаляются без потери состояния, а при пределе ключей вытесняются по одному самые давние
+    def __init__(self, rate=0.5, burst=1, scope='user', max_keys=100000):
+        if scope not in SCOPES:
+            raise ValueError(f"Неизвестная область антифлуда: {scope}")
+        self.rate = rate
+        self.burst = burst
+        self.scope = scope
+        self.field = SCOPES[scope]
+        self.max_keys = max_keys
+        self.idle_ttl = burst / rate  # Через это время бездействия бакет снова полон
+        self.buckets = OrderedDict()  # ключ -> TokenBucket, от давно активных к недавним
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+        print(f"🔹 Антифлуд система инициализирована ({rate} действий/сек, всплеск {burst}, по {scope})")
+
+    def key(self, payload):
+        return getattr(payload, self.field)
+
+    async def check_flood(self, key):
+        # True - действие нужно отклонить
+        now = time.monotonic()
+        self._sweep(now)
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_keys:
+                # Предел памяти (рейд): вытесняется один самый давний ключ, активные флудеры остаются
+                self.buckets.popitem(last=False)
+                self.evicted += 1
+            bucket = self.buckets[key] = TokenBucket(self.rate, self.burst, now)
+        else:
+            self.buckets.move_to_end(key)
+
+        if bucket.wait_time(now) > 0:
+            self.limited += 1
+            logging.warning(f'Обнаружен флуд: {self.scope} {key}', extra={self.field: key, 'sample': 'flood'})
+            return True
+        bucket.take()
+        self.allowed += 1
+        return False
+
+    def _sweep(self, now):
+        # Ключи, не трогавшиеся дольше idle_ttl, имеют полные бакеты - их можно забыть.
+        # updated бакета - время последней проверки, порядок словаря совпадает с ним
+        expired = now - self.idle_ttl
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if bucket.updated > expired:
+                break
+            del self.buckets[key]
+
+    def stats(self):
+        return {
+            'keys': len(self.buckets),
+            'allowed': self.allowed,
+            'limited': self.limited,
+            'evicted': self.evicted
+        }
\ No newline at end of file
@@ -1,32 +1,288 @@
 import numpy as np
-import sounddevice as sd
-from collections import deque
+from collections import deque, namedtuple
+from multiprocessing import shared_memory
 import io
 import wave
+import threading
 import logging
-from numba import jit
+import time
+from numba import jit, prange
 from config import Config
 
-@jit(nopython=True, fastmath=True)
+# nogil: ядра отпускают GIL, и пул потоков считает разные каналы параллельно;
+# cache: скомпилированный код сохраняется в __pycache__ и не собирается заново при каждом запуске
+@jit(nopython=True, nogil=True, fastmath=True, cache=True)
 def calculate_rms_numba(buffer):
     return np.sqrt(np.mean(np.square(buffer)))
 
+@jit(nopython=True, nogil=True, fastmath=True, cache=True)
+def sum_squares_numba(buffer):
+    # Сумма квадратов с накоплением в float64
+    total = 0.0
+    for i in range(buffer.shape[0]):
+        total += buffer[i] * buffer[i]
+    return total
+
+@jit(nopython=True, nogil=True, parallel=True, fastmath=True, cache=True)
+def batch_sum_squares_numba(blocks):
+    # Суммы квадратов по строкам матрицы блоков (строки считаются параллельно)
+    result = np.zeros(blocks.shape[0])
+    for i in prange(blocks.shape[0]):
+        total = 0.0
+        for j in range(blocks.shape[1]):
+            total += blocks[i, j] * blocks[i, j]
+        result[i] = total
+    return result
+
+def warmup_kernels():
+    # Загрузка (или первая компиляция) ядер с типами боевых вызовов до первого голосового тика
+    started = time.perf_counter()
+    block = np.zeros(480, dtype=np.float32)
+    calculate_rms_numba(block)
+    sum_squares_numba(block)
+    batch_sum_squares_numba(np.zeros((2, 480), dtype=np.float32))
+    return time.perf_counter() - started
+
+class RingBuffer:
+    # Кольцевой буфер фиксированного размера поверх предвыделенного массива
+    def __init__(self, capacity, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.data = np.zeros(self.capacity, dtype=dtype)
+        self.total_written = 0  # Сколько сэмплов записано за всё время
+
+    def __len__(self):
+        return min(self.total_written, self.capacity)
+
+    @property
+    def write_pos(self):
+        # Позиция следующей записи
+        return self.total_written % self.capacity
+
+    def write(self, block):
+        # Одна векторная запись блока (максимум две копии при переходе через край).
+        # Счётчик обновляется последним, чтобы читатели видели только записанные данные
+        n = len(block)
+        if n == 0:
+            return
+        if n > self.capacity:
+            block = block[-self.capacity:]
+        start = (self.total_written + n - len(block)) % self.capacity
+        end = start + len(block)
+        if end <= self.capacity:
+            self.data[start:end] = block
+        else:
+            first = self.capacity - start
+            self.data[start:] = block[:first]
+            self.data[:end - self.capacity] = block[first:]
+        self.total_written += n
+
+    def _views(self, count, total):
+        # Срезы count сэмплов, заканчивающихся на абсолютной позиции total
+        count = min(int(count), total, self.capacity)
+        if count <= 0:
+            return ()
+        end = total % self.capacity
+        start = (end - count) % self.capacity
+        if start + count <= self.capacity:
+            return (self.data[start:start + count],)
+        return (self.data[start:], self.data[:end])
+
+    def views(self, count):
+        # Последние count сэмплов в виде одного или двух срезов без копирования
+        return self._views(count, self.total_written)
+
+    def views_since(self, position):
+        # Сэмплы, записанные после абсолютной позиции position, и новая позиция.
+        # Если читатель отстал больше чем на размер буфера, старые сэмплы теряются
+        total = self.total_written
+        return self._views(total - position, total), total
+
+    def latest(self, count):
+        # Последние count сэмплов одним массивом (копия только при переходе через край)
+        parts = self.views(count)
+        if not parts:
+            return self.data[:0]
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def clear(self):
+        self.total_written = 0
+
+class SharedRingBuffer(RingBuffer):
+    # Кольцевой буфер в разделяемой памяти: пишет один поток владельца, процессы пула
+    # читают по имени блока без копирования. Первые 8 байт - счётчик total_written (int64),
+    # он обновляется после данных, поэтому блокировки не нужны
+    def __init__(self, capacity, dtype=np.float32, name=None):
+        self.capacity = int(capacity)
+        dtype = np.dtype(dtype)
+        self.owner = name is None
+        shm = shared_memory.SharedMemory(name=name, create=self.owner, size=8 + self.capacity * dtype.itemsize)
+        # Представления заводятся раньше shm: при сборке мусора они освобождаются первыми
+        self._header = np.ndarray((1,), dtype=np.int64, buffer=shm.buf)
+        self.data = np.ndarray((self.capacity,), dtype=dtype, buffer=shm.buf, offset=8)
+        self.shm = shm
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def total_written(self):
+        return int(self._header[0])
+
+    @total_written.setter
+    def total_written(self, value):
+        self._header[0] = value
+
+    def close(self):
+        # Отключение от блока (в читающем процессе)
+        self._header = None
+        self.data = None
+        self.shm.close()
+
+    def unlink(self):
+        # Блок удаляется, когда его закроют все процессы
+        if self.owner:
+            self.shm.unlink()
+
+class AudioConsumer:
+    # Читатель кольцевого буфера со своей позицией: каждый сэмпл выдаётся один раз
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.position = buffer.total_written  # Абсолютная позиция следующего сэмпла
+        self.lost = 0  # Сэмплы, перезаписанные до того, как их прочитали
+
+    def read(self):
+        # Все непрочитанные сэмплы без копирования и позиция первого из них
+        parts, total = self.buffer.views_since(self.position)
+        available = sum(len(part) for part in parts)
+        start = total - available
+        self.lost += start - self.position
+        self.position = total
+        return parts, start
+
+    def read_range(self):
+        # Как read, но только границы [начало, конец) - данные прочитает другой процесс
+        total = self.buffer.total_written
+        start = max(self.position, total - self.buffer.capacity)
+        self.lost += start - self.position
+        self.position = total
+        return start, total
+
+def to_db(mean_square):
+    # Перевод среднего квадрата в dB (20*log10(rms) == 10*log10(rms^2))
+    return 10 * np.log10(mean_square) if mean_square > 0 else -100
+
+class SlidingEnergy:
+    # Скользящее окно энергии из поблочных сумм квадратов
+    def __init__(self, window_samples):
+        self.window_samples = max(1, int(window_samples))
+        self.blocks = deque()  # (сумма квадратов, число сэмплов)
+        self.energy = 0.0
+        self.count = 0
+        self._updates = 0
+
+    def push(self, energy, count):
+        self.blocks.append((energy, count))
+        self.energy += energy
+        self.count += count
+        # Выбрасываем старые блоки, пока оставшиеся покрывают окно
+        while len(self.blocks) > 1 and self.count - self.blocks[0][1] >= self.window_samples:
+            old_energy, old_count = self.blocks.popleft()
+            self.energy -= old_energy
+            self.count -= old_count
+
+        # Периодически пересчитываем сумму, чтобы не копить ошибку округления
+        self._updates += 1
+        if self._updates >= 1024:
+            self._updates = 0
+            self.energy = sum(e for e, _ in self.blocks)
+
+    def mean_square(self):
+        return self.energy / self.count if self.count else 0.0
+
+    def clear(self):
+        self.blocks.clear()
+        self.energy = 0.0
+        self.count = 0
+
+class LoudnessTracker:
+    # Потоковая громкость: каждый вызов обрабатывает только новые сэмплы
+    def __init__(self, sample_rate, long_window, short_window, ema_seconds=0, block_seconds=0.1):
+        self.sample_rate = sample_rate
+        self.block_size = max(1, int(sample_rate * block_seconds))
+        self.windows = {
+            'long': SlidingEnergy(sample_rate * long_window),
+            'short': SlidingEnergy(sample_rate * short_window),
+        }
+        self.ema_samples = sample_rate * ema_seconds  # 0 - EMA выключена
+        self.ema = None
+
+    @property
+    def has_data(self):
+        return self.windows['long'].count > 0
+
+    def update(self, parts):
+        # Разбиваем новые сэмплы на блоки и считаем сумму квадратов каждого
+        for part in parts:
+            for start in range(0, len(part), self.block_size):
+                block = part[start:start + self.block_size]
+                self.push_block(sum_squares_numba(block), len(block))
+
+    def push_block(self, energy, count):
+        if count == 0:
+            return
+        for window in self.windows.values():
+            window.push(energy, count)
+
+        if self.ema_samples:
+            block_ms = energy / count
+            if self.ema is None:
+                self.ema = block_ms
+            else:
+                alpha = 1 - np.exp(-count / self.ema_samples)
+                self.ema += alpha * (block_ms - self.ema)
+
+    def db(self, window='long'):
+        if window == 'ema':
+            return to_db(self.ema or 0.0)
+        return to_db(self.windows[window].mean_square())
+
+    def reset(self):
+        for window in self.windows.values():
+            window.clear()
+        self.ema = None
+
 class AudioAnalyzer:
-    def __init__(self, sample_rate=48000, history_size=5):
+    def __init__(self, sample_rate=48000, history_size=5, shared=False):
         self.sample_rate = sample_rate
-        self.buffer = deque(maxlen=sample_rate * 10)  # 10 секундный буфер
+        buffer_class = SharedRingBuffer if shared else RingBuffer  # shared - для анализа в процессах
+        self.buffer = buffer_class(sample_rate * Config.BUFFER_SECONDS)  # 10 секундный буфер
+        self.loudness = LoudnessTracker(
+            sample_rate,
+            long_window=Config.VOLUME_WINDOW,
+            short_window=Config.VOLUME_SHORT_WINDOW,
+            ema_seconds=Config.VOLUME_EMA_SECONDS
+        )
+        self.loudness_reader = AudioConsumer(self.buffer)  # Ещё не учтённые в громкости сэмплы
         self.stream = None
         self.volume_history = deque(maxlen=history_size)
         self.active = False
-        print("🔹 Анализатор аудио инициализирован")
+        self.block_listener = None  # Вызывается из потока записи, когда накопился блок
+        self.block_samples = 0
+        self.unsignalled = 0
+        self.block_pending = False
+        logging.debug("🔹 Анализатор аудио инициализирован")  # Создаётся на каждого участника канала
         
     def start(self):
         if self.active:
             return
+        import sounddevice as sd  # Нужен только для локального микрофона
             
         def callback(indata, frames, time, status):
             if self.active:
-                self.buffer.extend(indata[:, 0])
+                self.feed(indata[:, 0])
             
         self.stream = sd.InputStream(
             samplerate=self.sample_rate,
@@ -44,15 +300,53 @@ class AudioAnalyzer:
             self.stream.close()
             self.active = False
             print("🔹 Аудиопоток остановлен")
+
+    def add_consumer(self):
+        # Новый независимый читатель аудио, начинающий с текущего момента
+        # (перекрытие фрагментов для распознавания делает VoiceActivityDetector)
+        return AudioConsumer(self.buffer)
+
+    def set_block_listener(self, listener, block_seconds):
+        # listener(analyzer) - сигнал "есть новое аудио"; не чаще одного необработанного сигнала
+        self.block_samples = max(1, int(self.sample_rate * block_seconds))
+        self.block_listener = listener
+
+    def block_done(self):
+        # Сигнал обработан: следующий блок снова вызовет listener
+        self.block_pending = False
+
+    def feed(self, samples):
+        # Запись блока сэмплов в кольцевой буфер
+        self.buffer.write(samples)
+        if self.block_listener is None:
+            return
+        self.unsignalled += len(samples)
+        if self.unsignalled >= self.block_samples and not self.block_pending:
+            self.unsignalled = 0
+            self.block_pending = True
+            self.block_listener(self)
+            
+    def release(self):
+        # Анализатор больше не нужен: удаляем блок разделяемой памяти
+        if isinstance(self.buffer, SharedRingBuffer):
+            self.buffer.unlink()
+
+    def pending_views(self):
+        # Сэмплы, ещё не учтённые в громкости
+        parts, _ = self.loudness_reader.read()
+        return parts
             
-    def calculate_volume(self):
-        if len(self.buffer) == 0:
+    def calculate_volume(self, window='long'):
+        # Обновляем громкость только по новым сэмплам
+        self.loudness.update(self.pending_views())
+        return self.current_volume(window)
+
+    def current_volume(self, window='long'):
+        # Громкость по уже учтённым сэмплам
+        if not self.loudness.has_data:
             return 0
             
-        audio_array = np.array(self.buffer)
-        rms = calculate_rms_numba(audio_array)
-        dB = 20 * np.log10(rms) if rms > 0 else -100
-        calibrated_dB = dB + Config.DB_CALIBRATION
+        calibrated_dB = self.loudness.db(window) + Config.DB_CALIBRATION
         
         self.volume_history.append(calibrated_dB)
         return calibrated_dB
@@ -64,20 +358,328 @@ class AudioAnalyzer:
     
     def reset_history(self):
         self.volume_history.clear()
-        print("🔹 История громкости сброшена")
+        logging.debug("🔹 История громкости сброшена")
         
     def get_audio_data(self, duration=2.0):
         samples_needed = int(self.sample_rate * duration)
         if len(self.buffer) < samples_needed:
             return None
             
-        audio_data = np.array(list(self.buffer)[-samples_needed:])
-        audio_data = (audio_data * 32767).astype(np.int16)
-        
-        with io.BytesIO() as wav_file:
-            with wave.open(wav_file, 'wb') as wav:
-                wav.setnchannels(1)
-                wav.setsampwidth(2)
-                wav.setframerate(self.sample_rate)
-                wav.writeframes(audio_data.tobytes())
-            return wav_file.getvalue()
\ No newline at end of file
+        return encode_wav(self.buffer.latest(samples_needed), self.sample_rate)
+
+class ChannelMixer:
+    # Сведение голосов участников в один поток канала: кадры каждого пользователя
+    # кладутся по времени прихода и суммируются, готовое отдаётся в sink с задержкой delay
+    def __init__(self, sink, sample_rate=48000, delay=0.1, speakers=None):
+        self.sink = sink  # sink(samples) - например, AudioAnalyzer.feed
+        self.sample_rate = sample_rate
+        self.delay = int(sample_rate * delay)  # Запас на неравномерный приход пакетов
+        self.speakers = speakers  # SpeakerIndex: энергия голосов по позициям выходного потока
+        self.pending = np.zeros(self.delay * 4, dtype=np.float32)
+        self.emitted = 0  # Абсолютный номер сэмпла pending[0]
+        self.written = 0  # Сколько сэмплов отдано в sink (позиция pending[0] в выходном потоке)
+        self.started = None
+        self.cursors = {}  # user_id -> позиция конца последнего кадра
+        self.lock = threading.Lock()  # feed - из потока приёма, flush - из обработчика
+
+    def _now_index(self, now):
+        return int((now - self.started) * self.sample_rate)
+
+    def feed(self, user_id, samples, now=None):
+        # Вызывается из потока приёма
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.started is None:
+                self.started = now
+            self._add(user_id, samples[-len(self.pending):], now)
+            self._emit(self._now_index(now) - self.delay)
+
+    def flush(self, now=None):
+        # Выдаёт накопленное к текущему моменту, даже если никто не говорит
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.started is not None:
+                self._emit(self._now_index(now) - self.delay)
+
+    def _add(self, user_id, samples, now):
+        arrival = self._now_index(now) - len(samples)
+        position = self.cursors.get(user_id, arrival)
+        if position < self.emitted or abs(position - arrival) > self.delay:
+            position = max(arrival, self.emitted)  # Речь после паузы или сбой часов - по времени прихода
+
+        end = position + len(samples)
+        if end - self.emitted > len(self.pending):
+            self._emit(end - len(self.pending))
+        offset = position - self.emitted
+        self.pending[offset:offset + len(samples)] += samples
+        self.cursors[user_id] = end
+        if self.speakers is not None:
+            self.speakers.add(user_id, self.written + offset, sum_squares_numba(samples))
+
+    def _emit(self, until):
+        count = until - self.emitted
+        if count <= 0:
+            return
+        ready = min(count, len(self.pending))
+        self.sink(np.clip(self.pending[:ready], -1.0, 1.0))
+        self.pending[:-ready] = self.pending[ready:]
+        self.pending[-ready:] = 0
+        # Долгая тишина не записывается целиком: хватает len(pending) нулей для VAD
+        self.emitted = until
+        self.written += ready
+
+class SpeakerIndex:
+    # Энергия голосов участников по интервалам выходного потока канала:
+    # кто звучал громче всех в промежутке высказывания
+    def __init__(self, sample_rate=48000, bucket_seconds=0.1, history_seconds=10):
+        self.bucket = max(1, int(sample_rate * bucket_seconds))
+        self.keep = max(1, int(history_seconds / bucket_seconds))  # Интервалов в истории
+        self.buckets = {}  # номер интервала -> {user_id: сумма квадратов}
+        self.oldest = 0
+        self.lock = threading.Lock()  # add - из потока приёма, dominant - из обработчика речи
+
+    def add(self, user_id, position, energy):
+        number = position // self.bucket
+        with self.lock:
+            if number < self.oldest:
+                return
+            if number - self.oldest >= self.keep:
+                self.oldest = number - self.keep + 1
+                self.buckets = {n: e for n, e in self.buckets.items() if n >= self.oldest}
+            energies = self.buckets.setdefault(number, {})
+            energies[user_id] = energies.get(user_id, 0.0) + energy
+
+    def dominant(self, start, end):
+        # Участник с наибольшей энергией в [start, end): O(k) по числу интервалов
+        totals = {}
+        with self.lock:
+            for number in range(start // self.bucket, (end - 1) // self.bucket + 1):
+                for user_id, energy in self.buckets.get(number, {}).items():
+                    totals[user_id] = totals.get(user_id, 0.0) + energy
+        return max(totals, key=totals.get) if totals else None
+
+# Сырой PCM для движков распознавания: моно int16 (little-endian) без контейнера
+PcmChunk = namedtuple('PcmChunk', 'data sample_rate sample_width')
+
+def to_pcm16(parts, sample_rate):
+    # float32 [-1, 1] -> int16 одним векторным проходом прямо в выходной массив;
+    # parts - массив или срезы кольцевого буфера (без промежуточной склейки)
+    if isinstance(parts, np.ndarray):
+        parts = (parts,)
+    pcm = np.empty(sum(len(part) for part in parts), dtype='<i2')
+    offset = 0
+    for part in parts:
+        out = pcm[offset:offset + len(part)]
+        np.multiply(np.clip(part, -1.0, 1.0), 32767, out=out, casting='unsafe')
+        offset += len(part)
+    return PcmChunk(pcm.tobytes(), sample_rate, 2)
+
+def encode_wav(samples, sample_rate):
+    # float32 [-1, 1] -> WAV (моно, int16)
+    pcm = to_pcm16(samples, sample_rate)
+    
+    with io.BytesIO() as wav_file:
+        with wave.open(wav_file, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(pcm.sample_width)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm.data)
+        return wav_file.getvalue()
+
+# Высказывание: аудио, абсолютная позиция первого сэмпла и признак того,
+# что это продолжение предыдущего фрагмента (начало перекрывается с ним)
+Utterance = namedtuple('Utterance', 'audio start continued')
+
+class VoiceActivityDetector:
+    # Детектор речи по энергии и частоте пересечений нуля (ZCR).
+    # Делит поток на высказывания; тишина и шум дальше не передаются
+    def __init__(self, sample_rate, frame_ms=20):
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.energy_db = Config.VAD_ENERGY_DB
+        self.max_zcr = Config.VAD_MAX_ZCR
+        self.hangover_frames = max(1, int(Config.VAD_HANGOVER_MS / frame_ms))
+        self.min_speech_frames = max(1, int(Config.VAD_MIN_SPEECH_MS / frame_ms))
+        self.max_frames = max(1, int(Config.VAD_MAX_UTTERANCE * 1000 / frame_ms))
+        # Длинное высказывание режется с перекрытием, чтобы не разрезать слово
+        self.overlap_frames = min(int(Config.ASR_OVERLAP_MS / frame_ms), self.max_frames - 1)
+        self.noise_db = None  # Адаптивная оценка уровня шума
+
+        self.position = 0  # Абсолютная позиция следующего сэмпла потока
+        self.pending = np.zeros(0, dtype=np.float32)  # Неполный кадр с прошлого вызова
+        self.pre_roll = deque(maxlen=self.hangover_frames)  # (позиция, кадр) перед началом речи
+        self.frames = []  # Кадры текущего высказывания
+        self.start = 0
+        self.continued = False
+        self.speech_frames = 0
+        self.silence_frames = 0
+
+        self.frames_forwarded = 0
+        self.frames_dropped = 0
+        self.utterances = 0
+
+    def _classify(self, frames):
+        # Векторно: энергия (dBFS) и ZCR для всех кадров сразу
+        energy = 10 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=1) + 1e-12)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        threshold = self.energy_db
+        if self.noise_db is not None:
+            threshold = max(threshold, self.noise_db + 6)
+        # Громкий кадр - речь всегда; тихий - только если он не похож на шум (низкий ZCR)
+        voiced = (energy > threshold + 10) | ((energy > threshold) & (zcr <= self.max_zcr))
+
+        silent = energy[~voiced]
+        if len(silent):
+            level = float(np.median(silent))
+            self.noise_db = level if self.noise_db is None else 0.95 * self.noise_db + 0.05 * level
+        return voiced
+
+    def process(self, samples, position=None):
+        # Принимает новые сэмплы (position - позиция первого из них в потоке),
+        # возвращает список завершённых высказываний
+        if position is not None and position != self.position:
+            self.pending = self.pending[:0]  # Разрыв в потоке: неполный кадр устарел
+            self.position = position
+        base = self.position - len(self.pending)
+        self.position += len(samples)
+
+        if len(self.pending):
+            samples = np.concatenate((self.pending, samples))
+        count = len(samples) // self.frame_size
+        frames = np.asarray(samples[:count * self.frame_size], dtype=np.float32).reshape(count, self.frame_size)
+        self.pending = np.array(samples[count * self.frame_size:], dtype=np.float32)
+        if count == 0:
+            return []
+
+        utterances = []
+        for index, (frame, voiced) in enumerate(zip(frames, self._classify(frames))):
+            frame_start = base + index * self.frame_size
+            if not self.frames:
+                if voiced:
+                    self.start = self.pre_roll[0][0] if self.pre_roll else frame_start
+                    self.frames.extend(f for _, f in self.pre_roll)
+                    self.pre_roll.clear()
+                    self.frames.append(frame.copy())
+                    self.continued = False
+                    self.speech_frames = 1
+                    self.silence_frames = 0
+                else:
+                    if len(self.pre_roll) == self.pre_roll.maxlen:
+                        self.frames_dropped += 1
+                    self.pre_roll.append((frame_start, frame.copy()))
+                continue
+
+            self.frames.append(frame.copy())
+            if voiced:
+                self.speech_frames += 1
+                self.silence_frames = 0
+            else:
+                self.silence_frames += 1
+
+            if self.silence_frames >= self.hangover_frames:
+                utterance = self._finish()
+                if utterance is not None:
+                    utterances.append(utterance)
+            elif len(self.frames) >= self.max_frames:
+                # Речь продолжается: следующий фрагмент начинается с хвоста текущего
+                overlap = self.frames[len(self.frames) - self.overlap_frames:]
+                utterances.append(self._finish())
+                self.frames = overlap
+                self.start = frame_start + self.frame_size * (1 - len(overlap))
+                self.continued = True
+                self.speech_frames = len(overlap)
+        return utterances
+
+    def flush(self):
+        # Завершает текущее высказывание (например, при остановке)
+        return self._finish()
+
+    def _finish(self):
+        frames = self.frames
+        self.frames = []
+        if self.speech_frames < self.min_speech_frames:
+            self.frames_dropped += len(frames)
+            return None
+        self.frames_forwarded += len(frames)
+        self.utterances += 1
+        return Utterance(np.concatenate(frames), self.start, self.continued)
+
+    def stats(self):
+        total = self.frames_forwarded + self.frames_dropped
+        return {
+            'frames_forwarded': self.frames_forwarded,
+            'frames_dropped': self.frames_dropped,
+            'utterances': self.utterances,
+            'dropped_ratio': self.frames_dropped / total if total else 0.0,
+        }
+
+def calculate_volumes_batch(analyzers, window='long'):
+    # Громкость всех пользователей за один вызов ядра: новые блоки каждого
+    # анализатора складываются в одну матрицу (короткие дополняются нулями)
+    chunks = []
+    owners = []  # (анализатор, число сэмплов) для каждой строки матрицы
+    for analyzer in analyzers.values():
+        block_size = analyzer.loudness.block_size
+        for part in analyzer.pending_views():
+            for start in range(0, len(part), block_size):
+                chunk = part[start:start + block_size]
+                chunks.append(chunk)
+                owners.append((analyzer, len(chunk)))
+
+    if chunks:
+        blocks = np.zeros((len(chunks), max(len(c) for c in chunks)), dtype=np.float32)
+        for row, chunk in enumerate(chunks):
+            blocks[row, :len(chunk)] = chunk
+        energies = batch_sum_squares_numba(blocks)
+        for (analyzer, count), energy in zip(owners, energies):
+            analyzer.loudness.push_block(energy, count)
+
+    return {user_id: analyzer.current_volume(window) for user_id, analyzer in analyzers.items()}
+
+# Анализ громкости в пуле процессов ===
+_attached = {}  # Буферы, открытые рабочим процессом: имя -> SharedRingBuffer (LRU)
+MAX_ATTACHED = 64
+
+def _attach(name, capacity):
+    buffer = _attached.pop(name, None)
+    if buffer is None:
+        buffer = SharedRingBuffer(capacity, name=name)
+        if len(_attached) >= MAX_ATTACHED:
+            _attached.pop(next(iter(_attached))).close()
+    _attached[name] = buffer
+    return buffer
+
+def shared_volume_jobs(analyzers):
+    # Задания для shared_block_energies: только имена блоков и границы новых сэмплов
+    return [
+        (analyzer.buffer.name, analyzer.buffer.capacity, *analyzer.loudness_reader.read_range(),
+         analyzer.loudness.block_size)
+        for analyzer in analyzers.values()
+    ]
+
+def shared_block_energies(jobs):
+    # Выполняется в процессе пула: аудио читается из разделяемой памяти,
+    # обратно уходят только суммы квадратов блоков [(энергия, число сэмплов), ...]
+    results = []
+    for name, capacity, start, end, block_size in jobs:
+        try:
+            buffer = _attach(name, capacity)
+        except FileNotFoundError:
+            results.append([])  # Анализатор удалён, пока задание ждало в очереди
+            continue
+        energies = []
+        for part in buffer._views(end - start, end):
+            for offset in range(0, len(part), block_size):
+                block = part[offset:offset + block_size]
+                energies.append((float(sum_squares_numba(block)), len(block)))
+        results.append(energies)
+    return results
+
+def apply_block_energies(analyzers, results, window='long'):
+    # Учёт посчитанных в пуле блоков и громкость пользователей
+    for analyzer, energies in zip(analyzers.values(), results):
+        for energy, count in energies:
+            analyzer.loudness.push_block(energy, count)
+    return {user_id: analyzer.current_volume(window) for user_id, analyzer in analyzers.items()}
\ No newline at end of file
@@ -0,0 +1,216 @@
+from collections import OrderedDict
+import asyncio
+import time
+import os
+
+# Окончания русских слов (упрощённый Snowball)
+REFLEXIVE_SUFFIXES = ('ся', 'сь')
+SUFFIXES = frozenset({
+    # Деепричастия и причастия
+    'вшись', 'ившись', 'ывшись', 'вши', 'ивши', 'ывши', 'ив', 'ыв', 'в',
+    'ующ', 'ющ', 'ащ', 'ящ', 'вш', 'ивш', 'ывш', 'ем', 'нн', 'енн',
+    # Прилагательные
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'им', 'ым', 'ом',
+    'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+    # Глаголы
+    'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'н', 'ло', 'но', 'ет', 'ют', 'ны', 'ть',
+    'ешь', 'нно', 'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'уй', 'ил',
+    'ыл', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть',
+    'ишь', 'ю',
+    # Существительные
+    'а', 'ев', 'ов', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'иям',
+    'ям', 'ием', 'ам', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ия', 'ья', 'я',
+})
+MAX_SUFFIX = max(len(suffix) for suffix in SUFFIXES)
+# Что может стоять после основы в словоформе: окончание и/или возвратная частица
+ENDINGS = frozenset(
+    ending + reflexive for ending in SUFFIXES | {''} for reflexive in REFLEXIVE_SUFFIXES + ('',)
+)
+
+MIN_STEM = 4  # Короче основу не обрезаем: иначе "гов" из "говно" совпадает с "говорю"
+# Исключение - короткие слова на гласную ("сука" -> "сук"): основа из 3 букв,
+# но после неё принимаются только падежные окончания ("суки", "сукой", не "сукно")
+SHORT_STEM = 3
+SHORT_SUFFIXES = frozenset({'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю'})
+SHORT_ENDINGS = frozenset({
+    '', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ой', 'ою', 'ей', 'ею', 'ам', 'ям',
+    'ами', 'ями', 'ах', 'ях', 'ом', 'ем', 'ов', 'ев',
+})
+
+def normalize(word):
+    return word.lower().replace('ё', 'е')
+
+def stem(word):
+    # Лёгкий стеммер: возвратная частица и одно окончание, основа не короче MIN_STEM
+    word = normalize(word)
+    for suffix in REFLEXIVE_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            word = word[:-len(suffix)]
+            break
+    # Самое длинное подходящее окончание: не больше MAX_SUFFIX поисков в множестве
+    for size in range(min(MAX_SUFFIX, len(word) - MIN_STEM), 0, -1):
+        if word[-size:] in SUFFIXES:
+            return word[:-size]
+    if len(word) - 1 >= SHORT_STEM and word[-1] in SHORT_SUFFIXES:
+        return word[:-1]
+    return word
+
+def levenshtein(a, b, limit):
+    # Расстояние Левенштейна с отсечением: всё, что больше limit, -> limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def deletions(word, depth):
+    # Все варианты слова с удалением до depth букв (включая само слово)
+    result = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        result |= frontier
+    return result
+
+def fuzzy_limit(length):
+    # Допустимое число опечаток зависит от длины основы
+    if length < 5:
+        return 0
+    if length < 8:
+        return 1
+    return 2
+
+class BanWordMatcher:
+    # Поиск запрещённых слов: префиксное дерево основ ловит словоформы,
+    # индекс удалений (ограниченное расстояние Левенштейна) - опечатки распознавания.
+    # Строится один раз на список
+    def __init__(self, words, cache_size=50000):
+        self.trie = {}
+        self.stems = {}  # основа -> исходное запрещённое слово
+        self.fuzzy_index = {}  # основа без 1-2 букв -> основы
+        self.cache = OrderedDict()  # Результаты по уже встречавшимся словам
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+        for word in words:
+            word = normalize(word.strip())
+            if not word:
+                continue
+            word_stem = stem(word)
+            if word_stem in self.stems:
+                continue
+            self.stems[word_stem] = word
+            node = self.trie
+            for char in word_stem:
+                node = node.setdefault(char, {})
+            node[None] = word  # None - конец основы
+            for variant in deletions(word_stem, fuzzy_limit(len(word_stem))):
+                self.fuzzy_index.setdefault(variant, []).append(word_stem)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(line for line in f if line.strip())
+
+    def __len__(self):
+        return len(self.stems)
+
+    def _prefix_match(self, token):
+        # Самая длинная основа-префикс, после которой остаётся известное окончание
+        # ("херсон" не совпадает с "хер": "сон" - не окончание)
+        node = self.trie
+        found = None
+        for depth, char in enumerate(token, 1):
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                # Укороченная основа ("сук" из "сука") допускает только падежные окончания
+                short = depth < MIN_STEM and len(node[None]) > depth
+                if token[depth:] in (SHORT_ENDINGS if short else ENDINGS):
+                    found = node[None]
+        return found
+
+    def _fuzzy_match(self, word, limit):
+        # Кандидаты - основы с общим вариантом удаления; расстояние проверяется точно
+        if limit <= 0:
+            return None
+        best, best_distance = None, limit + 1
+        for variant in deletions(word, limit):
+            for candidate in self.fuzzy_index.get(variant, ()):
+                # Предел - меньший из допусков слова и основы; сверх него levenshtein даёт cap + 1
+                cap = min(limit, fuzzy_limit(len(candidate)))
+                distance = levenshtein(word, candidate, cap)
+                if distance > cap:
+                    continue
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        return self.stems[best] if best is not None else None
+
+    def match_word(self, token):
+        # Запрещённое слово, которому соответствует token, или None
+        token = normalize(token)
+        if token in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(token)
+            return self.cache[token]
+        self.misses += 1
+
+        result = self._prefix_match(token)
+        if result is None:
+            token_stem = stem(token)
+            result = self._fuzzy_match(token_stem, fuzzy_limit(len(token_stem)))
+
+        self.cache[token] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def find(self, words):
+        # Первая пара (слово, запрещённое слово) среди новых слов или None
+        for word in words:
+            banned = self.match_word(word)
+            if banned is not None:
+                return word, banned
+        return None
+
+class BanWordWatcher:
+    # Держит актуальный матчер: следит за mtime файла и пересобирает список в фоне.
+    # Новый матчер подменяет старый одним присваиванием, поиск не блокируется
+    def __init__(self, path):
+        self.path = path
+        self.matcher = BanWordMatcher([])
+        self.mtime = None
+        self.lock = asyncio.Lock()
+
+    def _build(self):
+        started = time.perf_counter()
+        mtime = os.stat(self.path).st_mtime_ns
+        matcher = BanWordMatcher.from_file(self.path)
+        return matcher, mtime, time.perf_counter() - started
+
+    def load(self):
+        # Синхронная загрузка при старте; возвращает (число слов, время сборки)
+        self.matcher, self.mtime, elapsed = self._build()
+        return len(self.matcher), elapsed
+
+    async def reload(self, executor=None):
+        # Сборка в пуле потоков и атомарная подмена матчера
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            matcher, mtime, elapsed = await loop.run_in_executor(executor, self._build)
+            self.matcher, self.mtime = matcher, mtime
+            return len(matcher), elapsed
+
+    def changed(self):
+        try:
+            return os.stat(self.path).st_mtime_ns != self.mtime
+        except FileNotFoundError:
+            return False
\ No newline at end of file
@@ -0,0 +1,261 @@
+from collections import deque
+import asyncio
+import logging
+import time
+
+# Приоритеты исходящих действий: меньше - важнее
+PRIORITY_BAN = 0
+PRIORITY_MUTE = 1
+PRIORITY_ROLE = 2
+PRIORITY_LOG = 3
+PRIORITY_NAMES = ('ban', 'mute', 'role', 'log')
+
+class TokenBucket:
+    # Ограничение частоты одного маршрута Discord API
+    def __init__(self, rate, capacity, now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        # Момент раньше последнего обновления не отнимает токены
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now):
+        # Секунд до появления токена (0 - можно выполнять)
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+class Action:
+    # Исходящее действие; поля target/add/remove читаются в момент выполнения,
+    # поэтому повторные запросы до старта просто меняют их (схлопывание)
+    def __init__(self, priority, route, key, run):
+        self.priority = priority
+        self.route = route
+        self.key = key
+        self.run = run  # корутина run(action)
+        self.future = asyncio.get_running_loop().create_future()
+        self.future.add_done_callback(_consume_exception)
+        self.enqueued_at = time.monotonic()
+        self.cancelled = False
+
+def _consume_exception(future):
+    # Ошибки логирует диспетчер; отправителю, не ждущему результат, они не нужны
+    if not future.cancelled():
+        future.exception()
+
+class ActionDispatcher:
+    # Центральная очередь действий Discord: приоритеты (бан > мут > роли > лог),
+    # токен-бакеты по маршрутам и схлопывание повторных операций над участником
+    def __init__(self, rate=5.0, burst=5, concurrency=4):
+        self.rate = rate
+        self.burst = burst
+        self.queues = [deque() for _ in PRIORITY_NAMES]
+        self.buckets = {}  # route -> TokenBucket
+        self.pending = {}  # key -> ещё не начатое Action
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.running = set()
+        self.latencies = deque(maxlen=1000)  # Ожидание в очереди (сек)
+        self.durations = deque(maxlen=1000)  # Выполнение запроса (сек)
+        self.enqueued = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    # Постановка действий ===
+    def _enqueue(self, priority, route, run, key=None):
+        action = Action(priority, route, key, run)
+        if key is not None:
+            self.pending[key] = action
+        self.queues[priority].append(action)
+        self.enqueued += 1
+        self.wakeup.set()
+        return action
+
+    def _drop(self, action, result=None):
+        # Действие потеряло смысл до выполнения (например, мут и сразу размут)
+        action.cancelled = True
+        self.pending.pop(action.key, None)
+        self.coalesced += 1
+        if not action.future.done():
+            action.future.set_result(result)
+
+    def set_mute(self, member, muted):
+        key = ('mute', member.guild.id, member.id)
+        action = self.pending.get(key)
+        if action is not None:
+            action.target = muted
+            if action.initial == muted:
+                self._drop(action)  # Мут и размут взаимно погасились (_drop считает схлопывание)
+            else:
+                self.coalesced += 1
+            return action.future
+
+        initial = member.voice.mute if member.voice else None
+        if initial == muted:
+            return _resolved(None)
+        action = self._enqueue(PRIORITY_MUTE, ('member', member.guild.id), self._run_mute, key)
+        action.member = member
+        action.initial = initial
+        action.target = muted
+        return action.future
+
+    def edit_roles(self, member, add=(), remove=()):
+        # Несколько изменений ролей участника сливаются в один member.edit(roles=...)
+        key = ('roles', member.guild.id, member.id)
+        action = self.pending.get(key)
+        merged = action is not None
+        if not merged:
+            action = self._enqueue(PRIORITY_ROLE, ('member', member.guild.id), self._run_roles, key)
+            action.member = member
+            action.add = {}
+            action.remove = set()
+
+        for role in add:
+            action.remove.discard(role.id)
+            action.add[role.id] = role
+        for role in remove:
+            action.add.pop(role.id, None)
+            action.remove.add(role.id)
+
+        if not self._roles_changed(action):
+            self._drop(action)  # Считается в _drop
+        elif merged:
+            self.coalesced += 1
+        return action.future
+
+    def ban(self, user, reason=None, delete_message_days=0):
+        async def run(action):
+            await user.ban(reason=reason, delete_message_days=delete_message_days)
+        return self._enqueue(PRIORITY_BAN, ('ban', user.guild.id), run).future
+
+    def unban(self, guild, user, reason=None):
+        async def run(action):
+            await guild.unban(user, reason=reason)
+        return self._enqueue(PRIORITY_BAN, ('ban', guild.id), run).future
+
+    def send(self, destination, content=None, **kwargs):
+        # Сообщение в канал или ЛС (Member/User): низший приоритет
+        route = ('channel', getattr(destination, 'id', None))
+        async def run(action):
+            return await destination.send(content, **kwargs)
+        return self._enqueue(PRIORITY_LOG, route, run).future
+
+    # Выполнение ===
+    async def _run_mute(self, action):
+        await action.member.edit(mute=action.target)
+
+    def _roles_changed(self, action):
+        current = {role.id for role in action.member.roles}
+        return any(role_id not in current for role_id in action.add) or bool(action.remove & current)
+
+    async def _run_roles(self, action):
+        if not self._roles_changed(action):
+            return
+        member = action.member
+        roles = [role for role in member.roles if not role.is_default() and role.id not in action.remove]
+        present = {role.id for role in roles}
+        roles += [role for role_id, role in action.add.items() if role_id not in present]
+        await member.edit(roles=roles)
+
+    def _bucket(self, route):
+        bucket = self.buckets.get(route)
+        if bucket is None:
+            bucket = self.buckets[route] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def _next_ready(self, now):
+        # Первое действие высшего приоритета, у маршрута которого есть токен.
+        # Возвращает (action, None) или (None, секунд до ближайшего токена)
+        wait = None
+        for queue in self.queues:
+            blocked = set()
+            for action in list(queue):
+                if action.cancelled:
+                    queue.remove(action)
+                    continue
+                if action.route in blocked:
+                    continue
+                delay = self._bucket(action.route).wait_time(now)
+                if delay == 0:
+                    queue.remove(action)
+                    return action, None
+                blocked.add(action.route)
+                wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, *self.running, return_exceptions=True)
+            self.task = None
+
+    async def _dispatch(self):
+        while True:
+            await self.semaphore.acquire()
+            action, wait = self._next_ready(time.monotonic())
+            if action is None:
+                self.semaphore.release()
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._bucket(action.route).take()
+            self.pending.pop(action.key, None)  # Новые запросы создадут новое действие
+            task = asyncio.create_task(self._execute(action))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _execute(self, action):
+        started = time.monotonic()
+        self.latencies.append(started - action.enqueued_at)
+        try:
+            result = await action.run(action)
+            self.executed += 1
+            if not action.future.done():
+                action.future.set_result(result)
+        except Exception as e:
+            self.failed += 1
+            logging.error(f"❌ Ошибка действия {PRIORITY_NAMES[action.priority]} {action.route}: {e}", extra={
+                'action': PRIORITY_NAMES[action.priority], 'latency': time.monotonic() - action.enqueued_at
+            })
+            if not action.future.done():
+                action.future.set_exception(e)
+        finally:
+            self.durations.append(time.monotonic() - started)
+            self.semaphore.release()
+
+    # Метрики ===
+    def stats(self):
+        waits = sorted(self.latencies)
+        return {
+            'depth': {name: sum(not action.cancelled for action in queue)
+                      for name, queue in zip(PRIORITY_NAMES, self.queues)},
+            'enqueued': self.enqueued,
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'failed': self.failed,
+            'wait_p50': waits[len(waits) // 2] if waits else 0.0,
+            'wait_p95': waits[int(len(waits) * 0.95)] if waits else 0.0,
+            'run_avg': sum(self.durations) / len(self.durations) if self.durations else 0.0
+        }
+
+def _resolved(result):
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(result)
+    return future
\ No newline at end of file
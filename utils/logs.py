@@ -0,0 +1,62 @@
+import logging.handlers
+import logging
+import queue
+import time
+from concurrent_log_handler import ConcurrentRotatingFileHandler
+
+# Стандартные атрибуты LogRecord; всё остальное из extra выводится как key=value
+RESERVED = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName', 'sample'}
+
+class StructuredFormatter(logging.Formatter):
+    # Сообщение + поля из extra: logging.info(msg, extra={'user_id': ..., 'action': 'mute', 'db': 42.0})
+    def format(self, record):
+        line = super().format(record)
+        fields = [
+            f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in vars(record).items()
+            if key not in RESERVED and not key.startswith('_')
+        ]
+        return f"{line} | {' '.join(fields)}" if fields else line
+
+class SamplingFilter(logging.Filter):
+    # Записи с extra={'sample': ключ} проходят не чаще раза в interval секунд на ключ;
+    # число пропущенных добавляется полем suppressed
+    def __init__(self, interval=10.0):
+        super().__init__()
+        self.interval = interval
+        self.last = {}  # ключ -> время последней записи
+        self.suppressed = {}  # ключ -> пропущено с тех пор
+
+    def filter(self, record):
+        key = getattr(record, 'sample', None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        if now - self.last.get(key, float('-inf')) < self.interval:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return False
+        self.last[key] = now
+        skipped = self.suppressed.pop(key, 0)
+        if skipped:
+            record.suppressed = skipped
+        return True
+
+def setup_logging(path='bot.log', level=logging.INFO, max_bytes=10 * 1024 * 1024, backups=5, sample_interval=10.0):
+    # Обработчики вызываются в фоновом потоке QueueListener: event loop только кладёт запись в очередь
+    formatter = StructuredFormatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = ConcurrentRotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_interval))  # Отсев до постановки в очередь
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.handlers[:] = [queue_handler]
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
\ No newline at end of file
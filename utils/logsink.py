@@ -0,0 +1,81 @@
+from datetime import datetime
+import asyncio
+import logging
+import discord
+
+MAX_FIELDS = 25  # Ограничение Discord на число полей embed
+
+class LogSink:
+    # Копит события модерации и отправляет их одним embed с полями:
+    # раз в flush_interval секунд или сразу при накоплении max_events
+    def __init__(self, bot, channel_id, title, flush_interval=10.0, max_events=10, color=None):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.title = title
+        self.flush_interval = flush_interval
+        self.max_events = min(max_events, MAX_FIELDS)
+        self.color = color or discord.Color.orange()
+        self.events = []  # (время, заголовок, текст, упоминание)
+        self.task = None
+        self.flush_tasks = set()
+        self.messages_sent = 0
+        self.events_sent = 0
+
+    def add(self, name, value, mention=None):
+        # mention попадает в текст сообщения: упоминания внутри embed не уведомляют
+        self.events.append((datetime.now(), name, value, mention))
+        if len(self.events) >= self.max_events:
+            task = asyncio.create_task(self.flush())
+            self.flush_tasks.add(task)
+            task.add_done_callback(self.flush_tasks.discard)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        # Остановка с отправкой накопленного
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        await asyncio.gather(*self.flush_tasks, return_exceptions=True)
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def render(self, events):
+        embed = discord.Embed(
+            title=f"{self.title} ({len(events)})",
+            color=self.color,
+            timestamp=events[-1][0].astimezone()
+        )
+        for time, name, value, _ in events:
+            embed.add_field(name=f"{time:%H:%M:%S} {name}"[:256], value=value[:1024], inline=False)
+        mentions = ' '.join(dict.fromkeys(mention for *_, mention in events if mention))
+        return mentions or None, embed
+
+    async def flush(self):
+        if not self.events:
+            return
+        events, self.events = self.events, []
+
+        channel = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            logging.error(f"❌ Канал журнала {self.channel_id} не найден, потеряно событий: {len(events)}")
+            return
+
+        sends = []
+        for start in range(0, len(events), MAX_FIELDS):
+            content, embed = self.render(events[start:start + MAX_FIELDS])
+            sends.append(self.bot.dispatcher.send(channel, content, embed=embed))
+        results = await asyncio.gather(*sends, return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, discord.Forbidden):
+                logging.error(f"❌ Нет прав отправлять сообщения в канал {self.channel_id}")
+            elif not isinstance(result, Exception):
+                self.messages_sent += 1
+        self.events_sent += len(events)
\ No newline at end of file
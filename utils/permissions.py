@@ -0,0 +1,83 @@
+import discord
+from discord.ext import commands
+
+class PermissionIndex:
+    # Права и роли участников по ID ролей: имя роли модератора разрешается в ID один раз
+    # при загрузке сервера, дальше индекс обновляется событиями о ролях и участниках
+    def __init__(self, role_name, excluded_roles=()):
+        self.role_name = role_name
+        self.role_key = role_name.casefold()
+        self.excluded = frozenset(excluded_roles)  # Не учитываются в лимите ролей
+        self.moderator_roles = {}  # guild_id -> {role_id} ролей с именем role_name
+        self.members = {}  # (guild_id, user_id) -> (frozenset ID ролей, число учитываемых ролей)
+
+    # Роли сервера ===
+    def load_guild(self, guild):
+        # Вызывается и после переподключения: изменения ролей за время простоя не дали
+        # on_member_update, поэтому записи участников сервера строятся заново по запросу
+        self.moderator_roles[guild.id] = {role.id for role in guild.roles if role.name.casefold() == self.role_key}
+        self._forget_members(guild)
+
+    def forget_guild(self, guild):
+        self.moderator_roles.pop(guild.id, None)
+        self._forget_members(guild)
+
+    def _forget_members(self, guild):
+        for key in [key for key in self.members if key[0] == guild.id]:
+            del self.members[key]
+
+    def role_updated(self, role):
+        # Создание или переименование роли
+        roles = self.moderator_roles.setdefault(role.guild.id, set())
+        if role.name.casefold() == self.role_key:
+            roles.add(role.id)
+        else:
+            roles.discard(role.id)
+
+    def role_deleted(self, role):
+        # Discord не присылает обновления участников при удалении роли - сбрасываем их записи
+        self.moderator_roles.get(role.guild.id, set()).discard(role.id)
+        stale = [key for key, (ids, _) in self.members.items() if key[0] == role.guild.id and role.id in ids]
+        for key in stale:
+            del self.members[key]
+
+    # Участники ===
+    def _entry(self, member):
+        key = (member.guild.id, member.id)
+        entry = self.members.get(key)
+        if entry is None:
+            entry = self.members[key] = self._build(member)
+        return entry
+
+    def _build(self, member):
+        ids = frozenset(role.id for role in member.roles)
+        return ids, len(ids - self.excluded)
+
+    def member_updated(self, member):
+        # Обновляем только уже известных участников, чтобы индекс не разрастался
+        key = (member.guild.id, member.id)
+        if key in self.members:
+            self.members[key] = self._build(member)
+
+    def member_removed(self, member):
+        self.members.pop((member.guild.id, member.id), None)
+
+    def is_moderator(self, member):
+        return not self._entry(member)[0].isdisjoint(self.moderator_roles.get(member.guild.id, ()))
+
+    def has_role(self, member, role_id):
+        return role_id in self._entry(member)[0]
+
+    def counted_roles(self, member):
+        # Число ролей участника без EXCROLES - для лимита MAX_ROLES_PER_USER
+        return self._entry(member)[1]
+
+def is_moderator():
+    # Замена commands.has_role(имя) через индекс бота (та же ошибка MissingRole)
+    async def predicate(ctx):
+        if not isinstance(ctx.author, discord.Member):
+            raise commands.NoPrivateMessage()
+        if not ctx.bot.permissions.is_moderator(ctx.author):
+            raise commands.MissingRole(ctx.bot.permissions.role_name)
+        return True
+    return commands.check(predicate)
\ No newline at end of file
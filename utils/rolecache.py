@@ -0,0 +1,51 @@
+class RoleCache:
+    # Роли по (guild_id, role_id) с сбросом по событиям об изменении ролей.
+    # discord.Role ссылается на свой Guild, поэтому записи сервера сбрасываются и тогда,
+    # когда discord.py пересоздаёт объект сервера (недоступность, переподключение)
+    def __init__(self):
+        self.roles = {}  # (guild_id, role_id) -> discord.Role
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, guild, role_id):
+        key = (guild.id, role_id)
+        role = self.roles.get(key)
+        if role is not None and role.guild is guild:  # Роль от прежнего объекта сервера - промах
+            self.hits += 1
+            return role
+        self.misses += 1
+        role = guild.get_role(role_id)
+        if role is not None:  # Отсутствие роли не кэшируем
+            self.roles[key] = role
+        return role
+
+    def preload(self, guild, role_ids):
+        # Прогрев ролей горячего пути (например, Config.ROLES) при подключении
+        for role_id in role_ids:
+            role = guild.get_role(role_id)
+            if role is not None:
+                self.roles[(guild.id, role_id)] = role
+
+    def invalidate(self, role):
+        if self.roles.pop((role.guild.id, role.id), None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self.roles)
+        self.roles.clear()
+
+    def forget_guild(self, guild_id):
+        for key in [key for key in self.roles if key[0] == guild_id]:
+            del self.roles[key]
+            self.invalidations += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.roles),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_ratio': self.hits / total if total else 0.0
+        }
\ No newline at end of file
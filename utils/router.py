@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+# handler(ctx, args) - простая команда модуля; handler=None - команда discord.py (bot.invoke)
+Route = namedtuple('Route', 'handler check denied')
+EXT_COMMAND = Route(None, None, None)
+
+class CommandRouter:
+    # Единый разбор команд всех модулей: канал и префикс проверяются до любых аллокаций,
+    # имя ищется в общей таблице, контекст discord.py создаётся только для найденной команды
+    def __init__(self, bot, prefix, allowed_channel_id):
+        self.bot = bot
+        self.prefix = prefix
+        self.allowed_channel_id = allowed_channel_id
+        self.handlers = {}  # имя -> Route простых команд модулей
+        self.table = {}  # имя -> Route, включая команды discord.py; пересобирается в refresh()
+        self.received = 0
+        self.routed = 0
+
+    def register(self, name, handler, check=None, denied=None):
+        # check(message) -> bool (корутина); denied - ответ при отказе
+        route = Route(handler, check, denied)
+        self.handlers[name] = route
+        self.table[name] = route
+
+    def unregister(self, *names):
+        for name in names:
+            self.handlers.pop(name, None)
+            self.table.pop(name, None)
+
+    def refresh(self):
+        # Команды discord.py (с псевдонимами) + простые команды модулей
+        table = dict.fromkeys(self.bot.all_commands, EXT_COMMAND)
+        table.update(self.handlers)
+        self.table = table
+
+    def resolve(self, content):
+        # (Route, аргументы) или None, если это не известная команда
+        if not content.startswith(self.prefix):
+            return None
+        parts = content[len(self.prefix):].split()
+        if not parts:
+            return None
+        route = self.table.get(parts[0].lower())
+        if route is None:
+            return None
+        return route, parts[1:]
+
+    async def dispatch(self, message):
+        # Вызывается из on_message бота для каждого сообщения
+        self.received += 1
+        if message.channel.id != self.allowed_channel_id or message.author.bot:
+            return False
+        resolved = self.resolve(message.content)
+        if resolved is None:
+            return False
+        route, args = resolved
+
+        self.routed += 1
+        ctx = await self.bot.get_context(message)
+        if route.handler is None:
+            if ctx.command is not None:  # Регистр имени важен для discord.py
+                await self.bot.invoke(ctx)
+            return True
+        if route.check and not await route.check(message):
+            await ctx.send(route.denied, delete_after=5.0)
+            return True
+        await route.handler(ctx, args)
+        return True
\ No newline at end of file
@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+class ExpiryScheduler:
+    # Общий планировщик сроков наказаний: одна куча дедлайнов вместо задачи на каждого.
+    # Отмена и перенос - ленивые: запись в куче становится устаревшей и пропускается
+    def __init__(self, workers=4, store=None):
+        self.heap = []  # (deadline, seq, key)
+        self.entries = {}  # key -> (deadline, seq, kind, payload)
+        self.handlers = {}  # kind -> корутина handler(payload)
+        self.workers = workers
+        self.store = store  # StateStore: сроки переживают перезапуск
+        self.queue = asyncio.Queue()
+        self.wakeup = asyncio.Event()
+        self.counter = itertools.count()
+        self.tasks = []
+        self.fired = 0
+        self.failed = 0
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def unregister(self, kind):
+        self.handlers.pop(kind, None)
+
+    def schedule(self, key, kind, delay, payload=None, persist=True):
+        # Ставит (или переносит) срок для key; payload - простой словарь с ID
+        deadline = time.monotonic() + delay
+        if self.store and persist:
+            self.store.put_timer(key, kind, payload, time.time() + delay)
+        seq = next(self.counter)
+        self.entries[key] = (deadline, seq, kind, payload)
+        heapq.heappush(self.heap, (deadline, seq, key))
+        if self.heap[0][1] == seq:
+            self.wakeup.set()  # Новый ближайший срок - будим диспетчер
+        self._compact()
+
+    def cancel(self, key):
+        if self.entries.pop(key, None) is None:
+            return False
+        if self.store:
+            self.store.delete_timer(key)
+        return True
+
+    def restore(self):
+        # Сроки из хранилища после перезапуска; просроченные срабатывают сразу
+        if self.store is None:
+            return 0
+        now = time.time()
+        timers = self.store.load_timers()
+        for key, kind, payload, expires_at in timers:
+            self.schedule(key, kind, max(0.0, expires_at - now), payload, persist=False)
+        return len(timers)
+
+    def remaining(self, key):
+        # Секунд до срабатывания или None, если срока нет
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return max(0.0, entry[0] - time.monotonic())
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _compact(self):
+        # Пересборка кучи, когда устаревших записей стало больше живых
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = [(deadline, seq, key) for key, (deadline, seq, _, _) in self.entries.items()]
+            heapq.heapify(self.heap)
+
+    def _is_stale(self, seq, key):
+        entry = self.entries.get(key)
+        return entry is None or entry[1] != seq
+
+    def start(self):
+        if self.tasks:
+            return
+        self.tasks.append(asyncio.create_task(self._dispatch()))
+        for _ in range(self.workers):
+            self.tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def _dispatch(self):
+        # Ждёт ближайший срок и передаёт сработавшие записи обработчикам
+        while True:
+            while self.heap and self._is_stale(self.heap[0][1], self.heap[0][2]):
+                heapq.heappop(self.heap)
+
+            if not self.heap:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            delay = self.heap[0][0] - time.monotonic()
+            if delay > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, key = heapq.heappop(self.heap)
+            _, _, kind, payload = self.entries.pop(key)
+            self.queue.put_nowait((key, kind, payload))
+
+    async def _worker(self):
+        while True:
+            key, kind, payload = await self.queue.get()
+            try:
+                handler = self.handlers.get(kind)
+                if handler is None:
+                    logging.warning(f"Нет обработчика для срока {kind}: {key}")
+                    continue
+                await handler(payload)
+                self.fired += 1
+            except Exception as e:
+                self.failed += 1
+                error_msg = f"❌ Ошибка обработчика {kind} для {key}: {e}"
+                logging.error(error_msg)
+            finally:
+                if self.store and key not in self.entries:
+                    self.store.delete_timer(key)
+                self.queue.task_done()
\ No newline at end of file
@@ -0,0 +1,129 @@
+import concurrent.futures
+import multiprocessing
+import asyncio
+import logging
+import json
+import os
+from config import Config
+
+class RecognitionError(Exception):
+    # Ошибка движка распознавания (сеть, модель и т.п.)
+    pass
+
+class RecognizerBackend:
+    # Интерфейс движка: PcmChunk -> текст в нижнем регистре ('' если речи нет)
+    name = None
+
+    def recognize(self, pcm):
+        raise NotImplementedError
+
+class GoogleBackend(RecognizerBackend):
+    # Облачное распознавание Google через speech_recognition
+    name = 'google'
+
+    def __init__(self, language=None, **options):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+        self.language = language or Config.ASR_LANGUAGE
+
+    def recognize(self, pcm):
+        audio = self.sr.AudioData(pcm.data, pcm.sample_rate, pcm.sample_width)
+        try:
+            return self.recognizer.recognize_google(audio, language=self.language).lower()
+        except self.sr.UnknownValueError:
+            return ''
+        except self.sr.RequestError as e:
+            raise RecognitionError(f"Ошибка сервиса распознавания: {e}")
+
+class VoskBackend(RecognizerBackend):
+    # Локальное офлайн-распознавание Vosk (модель загружается один раз на процесс)
+    name = 'vosk'
+
+    def __init__(self, model_path=None, **options):
+        try:
+            import vosk
+        except ImportError:
+            raise RecognitionError("Для ASR_BACKEND=vosk установите пакет vosk")
+
+        model_path = model_path or Config.VOSK_MODEL_PATH
+        if not model_path or not os.path.isdir(model_path):
+            raise RecognitionError(f"Модель Vosk не найдена: {model_path}")
+
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def recognize(self, pcm):
+        recognizer = self.vosk.KaldiRecognizer(self.model, pcm.sample_rate)
+        recognizer.AcceptWaveform(pcm.data)
+        return json.loads(recognizer.FinalResult()).get('text', '').lower()
+
+class StubBackend(RecognizerBackend):
+    # Детерминированная заглушка для тестов: одинаковый текст на любой фрагмент
+    name = 'stub'
+
+    def __init__(self, text=None, **options):
+        self.text = (text if text is not None else Config.ASR_STUB_TEXT).lower()
+
+    def recognize(self, pcm):
+        return self.text if pcm.data else ''
+
+def drop_overlap_words(previous, words, max_overlap=8):
+    # Убирает из начала words слова, повторяющие конец previous (перекрытие фрагментов)
+    for size in range(min(len(previous), len(words), max_overlap), 0, -1):
+        if previous[-size:] == words[:size]:
+            return words[size:]
+    return words
+
+BACKENDS = {backend.name: backend for backend in (GoogleBackend, VoskBackend, StubBackend)}
+
+def create_backend(name, **options):
+    if name not in BACKENDS:
+        raise RecognitionError(f"Неизвестный движок распознавания: {name}")
+    return BACKENDS[name](**options)
+
+# Движок рабочего процесса создаётся один раз в инициализаторе пула
+_worker_backend = None
+
+def _init_worker(name, options):
+    global _worker_backend
+    _worker_backend = create_backend(name, **options)
+
+def _recognize_in_worker(pcm):
+    return _worker_backend.recognize(pcm)
+
+class RecognitionPool:
+    # Отдельный пул процессов для распознавания речи, не занимающий bot.executor
+    def __init__(self, backend=None, workers=None, **options):
+        self.backend = backend or Config.ASR_BACKEND
+        self.workers = workers or Config.ASR_WORKERS or os.cpu_count() or 1
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers,
+            # spawn: форк процесса с потоками discord.py и numba небезопасен
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.backend, options)
+        )
+        self.in_flight = 0
+        self.completed = 0
+        self.skipped = 0
+        print(f"🔹 Распознавание речи: {self.backend}, процессов: {self.workers}")
+
+    @property
+    def saturated(self):
+        # Не держим в очереди больше двух фрагментов на процесс
+        return self.in_flight >= self.workers * 2
+
+    async def recognize(self, pcm):
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(self.executor, _recognize_in_worker, pcm)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        logging.info(f"Пул распознавания остановлен: выполнено {self.completed}, пропущено {self.skipped}")
\ No newline at end of file
@@ -0,0 +1,181 @@
+import threading
+import logging
+import sqlite3
+import queue
+import json
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS timers (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS timers_expires_at ON timers (expires_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, user_id)
+);
+CREATE TABLE IF NOT EXISTS manual_mutes (
+    user_id INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL,
+    moderator_id INTEGER,
+    muted_at REAL NOT NULL,
+    duration INTEGER
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+def encode_key(key):
+    return json.dumps(list(key) if isinstance(key, tuple) else key)
+
+def decode_key(text):
+    key = json.loads(text)
+    return tuple(key) if isinstance(key, list) else key
+
+class StateStore:
+    # Состояние модерации в SQLite (WAL). Запись отложенная: изменения копятся в очереди
+    # и фиксируются пачками в отдельном потоке, event loop на диск не ждёт
+    def __init__(self, path, flush_interval=0.2, batch_size=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue = queue.SimpleQueue()
+        self.written = 0
+        self.batches = 0
+
+        db = self._connect()
+        db.executescript(SCHEMA)
+        db.close()
+
+        self.thread = threading.Thread(target=self._writer, name="state-store", daemon=True)
+        self.thread.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # В WAL достаточно для сохранности при сбое процесса
+        return db
+
+    # Запись ===
+    def _write(self, sql, params=()):
+        self.queue.put((sql, params))
+
+    def put_timer(self, key, kind, payload, expires_at):
+        # expires_at - время по часам системы (time.time()), переживает перезапуск
+        self._write(
+            "INSERT OR REPLACE INTO timers (key, kind, payload, expires_at) VALUES (?, ?, ?, ?)",
+            (encode_key(key), kind, json.dumps(payload), expires_at)
+        )
+
+    def delete_timer(self, key):
+        self._write("DELETE FROM timers WHERE key = ?", (encode_key(key),))
+
+    def set_counter(self, name, user_id, value):
+        self._write(
+            "INSERT OR REPLACE INTO counters (name, user_id, value) VALUES (?, ?, ?)",
+            (name, user_id, value)
+        )
+
+    def delete_counter(self, name, user_id):
+        self._write("DELETE FROM counters WHERE name = ? AND user_id = ?", (name, user_id))
+
+    def save_manual_mute(self, user_id, channel_id, moderator_id, muted_at, duration):
+        self._write(
+            "INSERT OR REPLACE INTO manual_mutes (user_id, channel_id, moderator_id, muted_at, duration) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (user_id, channel_id, moderator_id, muted_at, duration)
+        )
+
+    def delete_manual_mute(self, user_id):
+        self._write("DELETE FROM manual_mutes WHERE user_id = ?", (user_id,))
+
+    def save_checkpoint(self, name, data):
+        # Прогресс долгих фоновых задач для продолжения после перезапуска
+        self._write(
+            "INSERT OR REPLACE INTO checkpoints (name, data, updated_at) VALUES (?, ?, ?)",
+            (name, json.dumps(data), time.time())
+        )
+
+    def delete_checkpoint(self, name):
+        self._write("DELETE FROM checkpoints WHERE name = ?", (name,))
+
+    def _writer(self):
+        db = self._connect()
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            time.sleep(self.flush_interval)  # Даём накопиться пачке
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            changes = [item for item in batch if isinstance(item, tuple)]
+            running = None not in batch
+            try:
+                with db:  # Одна транзакция на пачку
+                    for sql, params in changes:
+                        db.execute(sql, params)
+                self.written += len(changes)
+                self.batches += 1
+            except sqlite3.Error as e:
+                error_msg = f"❌ Ошибка записи состояния ({len(changes)} изменений): {e}"
+                logging.error(error_msg)
+            finally:
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+        db.close()
+
+    def flush(self, timeout=None):
+        # Блокирующее ожидание записи всех поставленных изменений
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        logging.info(f"Хранилище состояния закрыто: {self.written} изменений в {self.batches} транзакциях")
+
+    # Чтение при старте ===
+    def _read(self, sql, params=()):
+        db = self._connect()
+        try:
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def load_timers(self):
+        # Все сроки по возрастанию expires_at (обход индекса, без сортировки таблицы)
+        rows = self._read("SELECT key, kind, payload, expires_at FROM timers ORDER BY expires_at")
+        return [(decode_key(key), kind, json.loads(payload), expires_at)
+                for key, kind, payload, expires_at in rows]
+
+    def load_counters(self, name):
+        return dict(self._read("SELECT user_id, value FROM counters WHERE name = ?", (name,)))
+
+    def load_checkpoint(self, name):
+        rows = self._read("SELECT data FROM checkpoints WHERE name = ?", (name,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def load_manual_mutes(self):
+        rows = self._read("SELECT user_id, channel_id, moderator_id, muted_at, duration FROM manual_mutes")
+        return {
+            user_id: {
+                'channel_id': channel_id,
+                'moderator_id': moderator_id,
+                'muted_at': muted_at,
+                'duration': duration
+            }
+            for user_id, channel_id, moderator_id, muted_at, duration in rows
+        }
\ No newline at end of file
@@ -0,0 +1,345 @@
+import discord
+from discord.voice_state import VoiceConnectionState
+from collections import namedtuple
+import numpy as np
+import threading
+import logging
+import struct
+import queue
+import time
+import nacl.secret
+from config import Config
+
+try:
+    import davey
+except ImportError:
+    davey = None
+
+RTP_HEADER = struct.Struct('>BBHII')
+RTCP_PAYLOAD_TYPES = range(200, 205)
+
+# Запись дампа: тип, смещение от начала записи (сек), длина тела
+DUMP_RECORD = struct.Struct('<BdI')
+DUMP_PACKET = struct.Struct('<IHI')  # ssrc, sequence, timestamp (+ opus payload)
+DUMP_SPEAKING = struct.Struct('<IQ')  # ssrc, user_id
+DUMP_DISCONNECT = struct.Struct('<Q')  # user_id
+KIND_PACKET, KIND_SPEAKING, KIND_DISCONNECT = 1, 2, 3
+
+VoicePacket = namedtuple('VoicePacket', 'ssrc sequence timestamp payload')
+
+def pcm_to_mono(pcm):
+    # Стерео int16 из декодера Opus -> моно float32 одной векторной операцией
+    samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, 2)
+    return samples.mean(axis=1, dtype=np.float32) / 32768
+
+class ReceivingVoiceClient(discord.VoiceClient):
+    # Голосовой клиент, который передаёт события SPEAKING получателю аудио
+    def __init__(self, client, channel):
+        super().__init__(client, channel)
+        self.receiver = None
+
+    def create_connection_state(self):
+        return VoiceConnectionState(self, hook=self._ws_hook)
+
+    async def _ws_hook(self, ws, msg):
+        receiver = self.receiver
+        if receiver is None:
+            return
+
+        op = msg.get('op')
+        data = msg.get('d') or {}
+        if op == ws.SPEAKING and 'ssrc' in data and 'user_id' in data:
+            receiver.put('speaking', int(data['ssrc']), int(data['user_id']))
+        elif op == ws.CLIENT_DISCONNECT and 'user_id' in data:
+            receiver.put('disconnect', int(data['user_id']))
+
+class VoiceClientSource:
+    # Пакеты с UDP-сокета голосового подключения (чтение делает поток discord.py)
+    def __init__(self, voice_client):
+        self.voice_client = voice_client
+        self.receiver = None
+        self._boxes = {}  # Ключ шифрования -> объект расшифровки
+
+    def attach(self, receiver):
+        self.receiver = receiver
+        self.voice_client.receiver = receiver
+        self.voice_client._connection.add_socket_listener(self._on_datagram)
+
+    def detach(self):
+        self.voice_client._connection.remove_socket_listener(self._on_datagram)
+        if self.voice_client.receiver is self.receiver:
+            self.voice_client.receiver = None
+        self.receiver = None
+
+    def _on_datagram(self, data):
+        # Вызывается в потоке сокета: только кладём пакет в очередь
+        receiver = self.receiver
+        if receiver is not None:
+            receiver.put('rtp', self, data)
+
+    def _box(self, aead):
+        key = bytes(self.voice_client.secret_key)
+        box = self._boxes.get((key, aead))
+        if box is None:
+            box = nacl.secret.Aead(key) if aead else nacl.secret.SecretBox(key)
+            self._boxes = {(key, aead): box}
+        return box
+
+    def unpack(self, data):
+        # Разбор RTP и транспортная расшифровка (выполняется в потоке получателя)
+        if len(data) < RTP_HEADER.size or data[1] in RTCP_PAYLOAD_TYPES:
+            return None
+        first, _, sequence, timestamp, ssrc = RTP_HEADER.unpack_from(data)
+        if first >> 6 != 2:
+            return None
+
+        header_size = RTP_HEADER.size + 4 * (first & 0x0F)  # + CSRC
+        has_extension = bool(first & 0x10)
+        mode = self.voice_client.mode
+
+        if mode == 'aead_xchacha20_poly1305_rtpsize':
+            # Заголовок расширения не шифруется и входит в AAD
+            if has_extension:
+                header_size += 4
+            nonce = data[-4:] + bytes(20)
+            payload = self._box(True).decrypt(bytes(data[header_size:-4]), bytes(data[:header_size]), nonce)
+            if has_extension:
+                extension_words = struct.unpack_from('>H', data, header_size - 2)[0]
+                payload = payload[4 * extension_words:]
+            return VoicePacket(ssrc, sequence, timestamp, payload)
+
+        if mode == 'xsalsa20_poly1305_lite':
+            payload = self._box(False).decrypt(bytes(data[RTP_HEADER.size:-4]), data[-4:] + bytes(20))
+        elif mode == 'xsalsa20_poly1305_suffix':
+            payload = self._box(False).decrypt(bytes(data[RTP_HEADER.size:-24]), bytes(data[-24:]))
+        elif mode == 'xsalsa20_poly1305':
+            payload = self._box(False).decrypt(bytes(data[RTP_HEADER.size:]), bytes(data[:RTP_HEADER.size]) + bytes(12))
+        else:
+            return None
+
+        # В старых режимах CSRC и расширение зашифрованы вместе с аудио
+        payload = payload[header_size - RTP_HEADER.size:]
+        if has_extension and len(payload) >= 4:
+            extension_words = struct.unpack_from('>H', payload, 2)[0]
+            payload = payload[4 + 4 * extension_words:]
+        return VoicePacket(ssrc, sequence, timestamp, payload)
+
+    def decrypt_frame(self, user_id, payload):
+        # Сквозное шифрование DAVE поверх Opus, если оно включено в канале
+        dave_session = getattr(self.voice_client._connection, 'dave_session', None)
+        if dave_session is None or davey is None or not dave_session.ready:
+            return payload
+        try:
+            return dave_session.decrypt(user_id, davey.MediaType.audio, payload)
+        except Exception:
+            if dave_session.can_passthrough(user_id):
+                return payload
+            raise
+
+class ReplayPacketSource:
+    # Воспроизведение записанного дампа пакетов для офлайн-проверки
+    def __init__(self, path, realtime=False):
+        self.path = path
+        self.realtime = realtime
+        self.receiver = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def attach(self, receiver):
+        self.receiver = receiver
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='voice-replay', daemon=True)
+        self._thread.start()
+
+    def detach(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.receiver = None
+
+    def _run(self):
+        started = time.monotonic()
+        try:
+            for kind, offset, body in read_packet_dump(self.path):
+                if self._stop.is_set():
+                    return
+                if self.realtime:
+                    delay = started + offset - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                if kind == KIND_PACKET:
+                    ssrc, sequence, timestamp = DUMP_PACKET.unpack_from(body)
+                    self._deliver('packet', VoicePacket(ssrc, sequence, timestamp, body[DUMP_PACKET.size:]))
+                elif kind == KIND_SPEAKING:
+                    self._deliver('speaking', *DUMP_SPEAKING.unpack(body))
+                elif kind == KIND_DISCONNECT:
+                    self._deliver('disconnect', *DUMP_DISCONNECT.unpack(body))
+        finally:
+            self._deliver('eof', self)
+
+    def _deliver(self, kind, *args):
+        # В отличие от живого сокета, дамп не теряет пакеты: ждём места в очереди
+        while not self._stop.is_set():
+            try:
+                self.receiver.events.put((kind, *args), timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+def read_packet_dump(path):
+    # Последовательно читает записи дампа: (тип, смещение, тело)
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(DUMP_RECORD.size)
+            if len(header) < DUMP_RECORD.size:
+                return
+            kind, offset, length = DUMP_RECORD.unpack(header)
+            body = f.read(length)
+            if len(body) < length:
+                return
+            yield kind, offset, body
+
+class PacketDumpWriter:
+    # Запись уже расшифрованных пакетов в дамп для последующего воспроизведения
+    def __init__(self, path):
+        self.file = open(path, 'ab')
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _write(self, kind, body):
+        offset = time.monotonic() - self.started
+        with self.lock:
+            self.file.write(DUMP_RECORD.pack(kind, offset, len(body)))
+            self.file.write(body)
+
+    def write_packet(self, packet):
+        self._write(KIND_PACKET, DUMP_PACKET.pack(packet.ssrc, packet.sequence, packet.timestamp) + packet.payload)
+
+    def write_speaking(self, ssrc, user_id):
+        self._write(KIND_SPEAKING, DUMP_SPEAKING.pack(ssrc, user_id))
+
+    def write_disconnect(self, user_id):
+        self._write(KIND_DISCONNECT, DUMP_DISCONNECT.pack(user_id))
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+class SpeakerRouter:
+    # Сопоставление SSRC -> пользователь, декодирование Opus и раздача PCM
+    def __init__(self, sink, decoder_factory=None, recorder=None):
+        self.sink = sink
+        self.decoder_factory = decoder_factory or discord.opus.Decoder
+        self.recorder = recorder
+        self.ssrc_users = {}
+        self.decoders = {}
+        self.last_sequence = {}
+        self.unknown_packets = 0
+        self.late_packets = 0
+
+    def map_ssrc(self, ssrc, user_id):
+        if self.ssrc_users.get(ssrc) != user_id:
+            # SSRC переназначен - старое состояние декодера не подходит
+            self.decoders.pop(ssrc, None)
+            self.last_sequence.pop(ssrc, None)
+        self.ssrc_users[ssrc] = user_id
+        if self.recorder:
+            self.recorder.write_speaking(ssrc, user_id)
+
+    def forget_user(self, user_id):
+        for ssrc in [s for s, uid in self.ssrc_users.items() if uid == user_id]:
+            del self.ssrc_users[ssrc]
+            self.decoders.pop(ssrc, None)
+            self.last_sequence.pop(ssrc, None)
+        if self.recorder:
+            self.recorder.write_disconnect(user_id)
+
+    def reset(self):
+        self.ssrc_users.clear()
+        self.decoders.clear()
+        self.last_sequence.clear()
+
+    def handle(self, packet, decrypt_frame=None):
+        user_id = self.ssrc_users.get(packet.ssrc)
+        if user_id is None:
+            self.unknown_packets += 1
+            return
+
+        # Дубликаты и опоздавшие пакеты отбрасываем (с учётом переполнения 16 бит)
+        last = self.last_sequence.get(packet.ssrc)
+        if last is not None and (last == packet.sequence or (packet.sequence - last) & 0xFFFF >= 0x8000):
+            self.late_packets += 1
+            return
+        self.last_sequence[packet.ssrc] = packet.sequence
+
+        payload = decrypt_frame(user_id, packet.payload) if decrypt_frame else packet.payload
+        if self.recorder:
+            self.recorder.write_packet(packet._replace(payload=payload))
+
+        decoder = self.decoders.get(packet.ssrc)
+        if decoder is None:
+            decoder = self.decoders[packet.ssrc] = self.decoder_factory()
+        self.sink(user_id, pcm_to_mono(decoder.decode(payload, fec=False)))
+
+class VoiceReceiver(threading.Thread):
+    # Поток приёма голоса: расшифровка, декодирование и раздача аудио по пользователям
+    def __init__(self, sink, decoder_factory=None, recorder=None):
+        super().__init__(name='voice-receiver', daemon=True)
+        self.events = queue.Queue(maxsize=Config.RECEIVE_QUEUE_SIZE)
+        self.router = SpeakerRouter(sink, decoder_factory, recorder)
+        self.sources = []
+        self.dropped_packets = 0
+        self.failed_packets = 0
+        self._running = threading.Event()
+
+    def add_source(self, source):
+        self.sources.append(source)
+        source.attach(self)
+
+    def put(self, kind, *args):
+        try:
+            self.events.put_nowait((kind, *args))
+        except queue.Full:
+            self.dropped_packets += 1
+
+    def start(self):
+        self._running.set()
+        super().start()
+        print("🔹 Приём голоса запущен")
+
+    def stop(self):
+        self._running.clear()
+        for source in list(self.sources):
+            source.detach()
+        self.sources.clear()
+        if self.router.recorder:
+            self.router.recorder.close()
+        print("🔹 Приём голоса остановлен")
+
+    def run(self):
+        while self._running.is_set():
+            try:
+                kind, *args = self.events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                if kind == 'rtp':
+                    source, data = args
+                    packet = source.unpack(data)
+                    if packet is not None:
+                        self.router.handle(packet, source.decrypt_frame)
+                elif kind == 'packet':
+                    self.router.handle(args[0])
+                elif kind == 'speaking':
+                    self.router.map_ssrc(*args)
+                elif kind == 'disconnect':
+                    self.router.forget_user(*args)
+                elif kind == 'reset':
+                    self.router.reset()
+                elif kind == 'eof' and args[0] in self.sources:
+                    self.sources.remove(args[0])
+            except Exception as e:
+                self.failed_packets += 1
+                logging.debug(f"Не удалось обработать голосовой пакет: {e}", extra={'sample': 'voice_packet'})
\ No newline at end of file
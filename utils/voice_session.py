@@ -0,0 +1,134 @@
+from datetime import datetime
+import threading
+import asyncio
+from config import Config
+from utils.audio import AudioAnalyzer, ChannelMixer, SpeakerIndex
+from utils.voice_receive import VoiceClientSource, VoiceReceiver, PacketDumpWriter
+
+class VoiceSession:
+    # Состояние мониторинга одного голосового канала: своё подключение, поток приёма,
+    # анализаторы участников, общий микс канала и собственная очередь событий
+    def __init__(self, bot, voice_client):
+        self.bot = bot
+        self.voice_client = voice_client
+        self.guild_id = voice_client.guild.id
+        self.receiver = None  # Приём голоса участников из голосового подключения
+        self.analyzers = {}  # {user_id: AudioAnalyzer}, пополняется из потока приёма
+        self.analyzers_lock = threading.Lock()
+        self.audio_events = asyncio.Queue()  # user_id с новым аудио; None - остановка мониторинга
+        self.active_users = set()  # Участники канала, которых можно заглушить
+        self.user_data = {}  # Для анализа громкости
+        self.mix = AudioAnalyzer()  # Все голоса канала - для распознавания речи
+        self.speakers = SpeakerIndex(self.mix.sample_rate, history_seconds=Config.BUFFER_SECONDS)  # Кто говорил в миксе
+        self.mixer = ChannelMixer(self.mix.feed, self.mix.sample_rate, speakers=self.speakers)
+        self.monitor_task = None
+
+    @property
+    def channel(self):
+        return self.voice_client.channel
+
+    def is_connected(self):
+        return self.voice_client.is_connected()
+
+# Приём голоса ===
+    def start(self):
+        # Запускает поток приёма голоса для подключения
+        recorder = PacketDumpWriter(Config.VOICE_DUMP_PATH) if Config.VOICE_DUMP_PATH else None
+        self.receiver = VoiceReceiver(self.feed_user_audio, recorder=recorder)
+        self.receiver.start()
+        self.receiver.add_source(VoiceClientSource(self.voice_client))
+        self.sync_members()
+
+    def stop(self):
+        if self.receiver:
+            self.receiver.stop()
+            self.receiver = None
+        self.audio_events.put_nowait(None)
+        for user_id in list(self.active_users):
+            self.untrack_member(user_id)
+
+    def moved(self):
+        # Бот перешёл в другой канал: SSRC назначаются заново, участники другие
+        if self.receiver:
+            self.receiver.put('reset')
+        self.sync_members()
+
+    def get_analyzer(self, user_id):
+        # Анализатор пользователя (создаётся при первом обращении)
+        with self.analyzers_lock:
+            analyzer = self.analyzers.get(user_id)
+            if analyzer is None:
+                analyzer = self.analyzers[user_id] = AudioAnalyzer(shared=self.bot.audio_pool is not None)
+                analyzer.set_block_listener(
+                    lambda _, uid=user_id: self.bot.loop.call_soon_threadsafe(self.audio_events.put_nowait, uid),
+                    Config.VOLUME_BLOCK_SECONDS
+                )
+            return analyzer
+
+    def drop_analyzer(self, user_id):
+        with self.analyzers_lock:
+            analyzer = self.analyzers.pop(user_id, None)
+        if analyzer is not None:
+            analyzer.release()
+
+    def feed_user_audio(self, user_id, samples):
+        # Вызывается из потока приёма: громкость - только для отслеживаемых, в микс - все
+        self.mixer.feed(user_id, samples)
+        analyzer = self.analyzers.get(user_id)
+        if analyzer is not None:
+            analyzer.feed(samples)
+
+# Участники ===
+    def is_monitored(self, member):
+        # Участник в канале сессии, которого имеет смысл слушать
+        voice = member.voice
+        return bool(
+            voice and voice.channel == self.channel
+            and not member.bot and not voice.deaf and not voice.mute
+        )
+
+    def track_member(self, member, current_time):
+        # Регистрирует пользователя для анализа громкости
+        if member.id not in self.user_data:
+            self.user_data[member.id] = {
+                'member': member,
+                'last_update': current_time,
+                'is_muted': False
+            }
+
+        user = self.user_data[member.id]
+        user['analyzer'] = self.get_analyzer(member.id)
+        user['member'] = member
+        self.active_users.add(member.id)
+        return user
+
+    def untrack_member(self, user_id):
+        # Прекращает анализ; данные заглушенных ботом сохраняются до снятия мута
+        self.active_users.discard(user_id)
+        self.drop_analyzer(user_id)
+        user = self.user_data.get(user_id)
+        if user is not None and not user['is_muted']:
+            del self.user_data[user_id]
+
+    def forget_member(self, user_id):
+        # Участник вышел из голосовых каналов
+        self.active_users.discard(user_id)
+        self.drop_analyzer(user_id)
+        self.user_data.pop(user_id, None)
+
+    def sync_members(self):
+        # Полный пересчёт активных участников - только при подключении или смене канала
+        current_time = datetime.now()
+        for user_id in list(self.active_users):
+            self.untrack_member(user_id)
+        for member in self.channel.members:
+            if self.is_monitored(member):
+                self.track_member(member, current_time)
+
+    def update_member(self, member):
+        # Изменение голосового состояния участника этого сервера
+        if self.is_monitored(member):
+            if member.id not in self.active_users:
+                self.track_member(member, datetime.now())
+        elif member.id in self.active_users:
+            self.untrack_member(member.id)
\ No newline at end of file